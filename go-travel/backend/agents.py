@@ -3,27 +3,43 @@ Agent Layer - Claude API for generating travel candidates
 """
 
 import anthropic
+import asyncio
+import hashlib
 import json
+import orjson
 import os
+import re
 from dotenv import load_dotenv
+from typing import AsyncIterator, Optional
+
+from cache import cache_get_many, cache_set
 
 load_dotenv()
 
-# Initialize Anthropic client
-client = anthropic.Anthropic(
-    api_key=os.getenv("ANTHROPIC_API_KEY")
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+CLAUDE_MAX_TOKENS = 2000
+
+# Candidate lists for a (city, vibe, count) barely change day to day; the
+# nightly prewarm job (prewarm.py) refreshes popular ones before they expire
+CANDIDATES_CACHE_TTL_SECONDS = 604800
+
+# The SDK retries 429/5xx/529 and connection errors with exponential backoff;
+# its default of 2 retries gives up too quickly when the API is overloaded
+CLAUDE_MAX_RETRIES = 4
+
+# Initialize Anthropic client (async, so /generate doesn't block the event loop;
+# module-level so the HTTP connection pool is reused across requests)
+client = anthropic.AsyncAnthropic(
+    api_key=os.getenv("ANTHROPIC_API_KEY"),
+    max_retries=CLAUDE_MAX_RETRIES,
 )
 
-def generate_candidates(city: str, vibe: str = "", num_places: int = 10) -> list[dict]:
-    """
-    Call Claude to generate candidate places for a city.
-    Returns a list of dicts with 'name' and 'search_query' only.
-    Claude does NOT provide coordinates (it hallucinates them).
-    """
-    
-    vibe_context = f" The traveler is looking for a {vibe} vibe." if vibe else ""
-    
-    prompt = f"""You are a travel expert. Generate exactly {num_places} must-visit places for someone traveling to {city}.{vibe_context}
+# Static instructions sent as a cached system block. Keep this byte-for-byte
+# stable across calls - any change invalidates Anthropic's prompt cache.
+# The output-format notes and long example list pad it past the minimum
+# cacheable length (PROMPT_CACHE_MIN_TOKENS); check_system_prompt_cacheable
+# verifies that at startup.
+SYSTEM_PROMPT = """You are a travel expert.
 
 IMPORTANT: Return ONLY a valid JSON array. No markdown, no explanation, no code blocks.
 
@@ -33,48 +49,313 @@ Each place should have:
 - "category": One of: "landmark", "restaurant", "museum", "nature", "nightlife", "shopping", "cultural"
 - "why": One sentence on why to visit (max 15 words)
 
+Output format:
+- The response is a single JSON array and nothing else. The first character is "[" and the last character is "]".
+- Every element of the array is a JSON object with exactly the four keys "name", "search_query", "category" and "why", in that order, and no other keys.
+- Every value is a JSON string. Do not use null, numbers, booleans, nested objects or arrays as values.
+- Use double quotes for keys and strings. Escape any double quote inside a string as \\". Do not add trailing commas.
+- Accented and non-Latin characters may be written as-is; they do not need to be escaped.
+- "category" is written in lowercase and is exactly one of the seven values listed above.
+- Put each object on its own line, as in the example below, so the array can be read one object at a time.
+
 Example format:
 [
-  {{"name": "Eiffel Tower", "search_query": "Eiffel Tower Paris France", "category": "landmark", "why": "Iconic symbol of Paris with stunning city views."}},
-  {{"name": "Le Comptoir du Panthéon", "search_query": "Le Comptoir du Panthéon Paris", "category": "restaurant", "why": "Classic Parisian café with amazing croissants."}}
+  {"name": "Eiffel Tower", "search_query": "Eiffel Tower Paris France", "category": "landmark", "why": "Iconic symbol of Paris with stunning city views."},
+  {"name": "Le Comptoir du Panthéon", "search_query": "Le Comptoir du Panthéon Paris", "category": "restaurant", "why": "Classic Parisian café with amazing croissants."},
+  {"name": "Musée d'Orsay", "search_query": "Musée d'Orsay Paris France", "category": "museum", "why": "Impressionist masterpieces inside a grand former railway station."},
+  {"name": "Jardin du Luxembourg", "search_query": "Jardin du Luxembourg Paris", "category": "nature", "why": "Tree-lined paths, fountains and chairs for a slow afternoon."},
+  {"name": "Le Syndicat", "search_query": "Le Syndicat bar Paris 10e", "category": "nightlife", "why": "Inventive cocktails made only with French spirits."},
+  {"name": "Marché aux Puces de Saint-Ouen", "search_query": "Marché aux Puces de Saint-Ouen Paris", "category": "shopping", "why": "Sprawling flea market full of antiques and vintage finds."},
+  {"name": "Sainte-Chapelle", "search_query": "Sainte-Chapelle Paris Île de la Cité", "category": "cultural", "why": "Gothic chapel wrapped in floor-to-ceiling stained glass."},
+  {"name": "Tokyo Skytree", "search_query": "Tokyo Skytree Sumida Tokyo Japan", "category": "landmark", "why": "Observation decks with views across the whole city."},
+  {"name": "Tsukiji Outer Market", "search_query": "Tsukiji Outer Market Tokyo", "category": "restaurant", "why": "Fresh sushi and grilled seafood from dozens of tiny stalls."},
+  {"name": "Tokyo National Museum", "search_query": "Tokyo National Museum Ueno Tokyo", "category": "museum", "why": "Japan's largest collection of samurai armour, scrolls and ceramics."},
+  {"name": "Shinjuku Gyoen", "search_query": "Shinjuku Gyoen National Garden Tokyo", "category": "nature", "why": "Landscaped gardens mixing Japanese, French and English styles."},
+  {"name": "Golden Gai", "search_query": "Shinjuku Golden Gai Tokyo", "category": "nightlife", "why": "Tiny alleyway bars, each seating only a handful of people."},
+  {"name": "Nakamise Shopping Street", "search_query": "Nakamise Shopping Street Asakusa Tokyo", "category": "shopping", "why": "Traditional snacks and souvenirs on the approach to Senso-ji."},
+  {"name": "Senso-ji Temple", "search_query": "Senso-ji Temple Asakusa Tokyo", "category": "cultural", "why": "Tokyo's oldest temple, approached through a lively market street."},
+  {"name": "Brooklyn Bridge", "search_query": "Brooklyn Bridge New York NY", "category": "landmark", "why": "Walk the wooden promenade for skyline views of Manhattan."},
+  {"name": "Katz's Delicatessen", "search_query": "Katz's Delicatessen Lower East Side New York", "category": "restaurant", "why": "Hand-carved pastrami sandwiches served since 1888."},
+  {"name": "The Metropolitan Museum of Art", "search_query": "The Metropolitan Museum of Art New York", "category": "museum", "why": "Five thousand years of art under one roof."},
+  {"name": "The High Line", "search_query": "The High Line New York", "category": "nature", "why": "Elevated park built on a disused freight rail line."},
+  {"name": "Borough Market", "search_query": "Borough Market London Bridge London", "category": "shopping", "why": "Historic food market packed with producers and street food."},
+  {"name": "Shakespeare's Globe", "search_query": "Shakespeare's Globe Bankside London", "category": "cultural", "why": "Open-air reconstruction of the theatre where Shakespeare worked."},
+  {"name": "Stanley Park Seawall", "search_query": "Stanley Park Seawall Vancouver", "category": "nature", "why": "Waterfront loop with mountain views, best by bike."}
+]
+
+Return exactly the number of places requested, as diverse places covering different categories. JSON only."""
+
+# Built once so every request sends the identical cached prefix
+SYSTEM_BLOCKS = [
+    {
+        "type": "text",
+        "text": SYSTEM_PROMPT,
+        "cache_control": {"type": "ephemeral"},
+    }
 ]
 
-Return exactly {num_places} diverse places covering different categories. JSON only:"""
+# Anthropic does not cache prompt prefixes shorter than this (Sonnet models)
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Only this short tail varies per call
+USER_PROMPT_TEMPLATE = "Generate exactly {num_places} must-visit places for someone traveling to {city}.{vibe_context}"
+VIBE_CONTEXT_TEMPLATE = " The traveler is looking for a {vibe} vibe."
+
+
+def candidate_count(num_days: int) -> int:
+    """Number of candidates to request for a trip: 6 places per day, min 6, max 30."""
+    return min(30, max(6, num_days * 6))
+
 
+def candidates_cache_key(city: str, vibe: str, num_places: int) -> str:
+    """Build the Redis key for a candidate list (lowercased, whitespace-collapsed)."""
+    normalized = " ".join(f"{city}|{vibe}|{num_places}".lower().split())
+    return "candidates:v2:" + hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def build_message_params(city: str, vibe: str = "", num_places: int = 10) -> dict:
+    """
+    Build the Messages API parameters for a candidate request.
+    Shared by stream_candidates and the Message Batches prewarm job.
+    """
+    prompt = USER_PROMPT_TEMPLATE.format_map({
+        "num_places": num_places,
+        "city": city,
+        "vibe_context": VIBE_CONTEXT_TEMPLATE.format_map({"vibe": vibe}) if vibe else "",
+    })
+    
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": CLAUDE_MAX_TOKENS,
+        "system": SYSTEM_BLOCKS,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+    }
+
+
+async def check_system_prompt_cacheable() -> bool:
+    """
+    Count the system block's tokens and warn if it is too short to cache.
+    
+    Returns:
+        True if the block reaches PROMPT_CACHE_MIN_TOKENS, False if it doesn't
+        or the count could not be fetched
+    """
     try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2000,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        counted = await client.messages.count_tokens(
+            model=CLAUDE_MODEL,
+            system=SYSTEM_BLOCKS,
+            messages=[{"role": "user", "content": "."}],
         )
-        
-        # Extract the response text
-        response_text = message.content[0].text.strip()
-        
+    except Exception as e:
+        print(f"WARNING: Could not count system prompt tokens: {e}")
+        return False
+    
+    if counted.input_tokens < PROMPT_CACHE_MIN_TOKENS:
+        print(
+            f"WARNING: System prompt is {counted.input_tokens} tokens, below the "
+            f"{PROMPT_CACHE_MIN_TOKENS}-token minimum - it will not be cached"
+        )
+        return False
+    return True
+
+
+def parse_candidates(response_text: str) -> list[dict]:
+    """
+    Parse Claude's response text into a list of candidate dicts.
+    Raises ValueError (orjson.JSONDecodeError for bad JSON) if the text
+    isn't a JSON array.
+    
+    The system prompt asks for bare JSON, so parse directly and only fall
+    back to stripping a markdown code fence if that fails.
+    """
+    try:
+        candidates = orjson.loads(response_text)
+    except orjson.JSONDecodeError:
         # Clean up response if needed (remove markdown code blocks if present)
+        response_text = response_text.strip()
         if response_text.startswith("```"):
             response_text = response_text.split("```")[1]
             if response_text.startswith("json"):
                 response_text = response_text[4:]
-        response_text = response_text.strip()
+        candidates = orjson.loads(response_text)
+    
+    if not isinstance(candidates, list):
+        raise ValueError(f"expected a JSON array, got {type(candidates).__name__}")
+    # Same as the stream parser: only objects are candidates
+    return [candidate for candidate in candidates if isinstance(candidate, dict)]
+
+
+# Characters that can change object nesting or string state while scanning
+_STRUCTURAL_CHARS = re.compile(r'[{}\[\]"\\]')
+
+
+class CandidateStreamParser:
+    """
+    Incrementally parse a streamed JSON array of candidate objects.
+    
+    feed() takes the next chunk of text and returns every object that is now
+    complete, so callers can start work on early places while Claude is
+    still writing the rest of the array.
+    
+    Objects are found by tracking brace depth (outside strings), so one
+    malformed object is logged and skipped instead of blocking the rest.
+    `complete` turns True once the closing "]" has been seen; `skipped`
+    counts objects that could not be decoded.
+    """
+    
+    def __init__(self):
+        self._buffer = ""
+        self._scan = 0          # Next buffer index to scan
+        self._depth = 0         # Brace/bracket depth inside the current object
+        self._in_string = False
+        self._started = False
+        self.complete = False
+        self.skipped = 0
+    
+    def feed(self, chunk: str) -> list[dict]:
+        items = []
+        if self.complete:
+            return items
+        self._buffer += chunk
         
-        # Parse JSON
-        candidates = json.loads(response_text)
+        if not self._started:
+            # Skip anything before the array (e.g. a stray ```json fence)
+            start = self._buffer.find("[")
+            if start == -1:
+                return items
+            self._buffer = self._buffer[start + 1:]
+            self._started = True
         
-        return candidates
+        buffer = self._buffer
+        while True:
+            if self._depth == 0:
+                # Between objects: skip separators, then expect "{" or "]"
+                pos = self._scan
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                # Drop consumed separators so the buffer holds one object at most
+                buffer = buffer[pos:]
+                self._scan = 0
+                if not buffer:
+                    break
+                if buffer[0] == "]":
+                    self.complete = True
+                    buffer = ""
+                    break
+                if buffer[0] != "{":
+                    # Not an object - resync at the next one (or the end)
+                    resync = min(
+                        (i for i in (buffer.find("{"), buffer.find("]")) if i != -1),
+                        default=len(buffer),
+                    )
+                    print(f"WARNING: Skipping non-object text in candidate stream: {buffer[:resync][:80]!r}")
+                    self.skipped += 1
+                    buffer = buffer[resync:]
+                    continue
+            
+            end = self._scan_object(buffer)
+            if end is None:
+                break  # Object not finished yet - wait for more text
+            
+            try:
+                item = orjson.loads(buffer[:end])
+            except orjson.JSONDecodeError as e:
+                print(f"WARNING: Skipping malformed candidate in stream: {e}")
+                self.skipped += 1
+            else:
+                items.append(item)
+            buffer = buffer[end:]
+            self._scan = 0
         
-    except json.JSONDecodeError as e:
-        print(f"JSON parsing error: {e}")
-        print(f"Raw response: {response_text}")
-        return []
+        self._buffer = buffer
+        return items
+    
+    def _scan_object(self, buffer: str) -> Optional[int]:
+        """Advance the scan through `buffer`; return the end index once the object closes."""
+        pos = self._scan
+        while True:
+            match = _STRUCTURAL_CHARS.search(buffer, pos)
+            if match is None:
+                self._scan = len(buffer)
+                return None
+            char = match.group()
+            pos = match.end()
+            if self._in_string:
+                if char == "\\":
+                    pos += 1  # Skip the escaped character, even if it hasn't arrived yet
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._scan = pos
+                    return pos
+
+
+async def stream_candidates(city: str, vibe: str = "", num_places: int = 10) -> AsyncIterator[dict]:
+    """
+    Stream candidate places for a city, yielding each one as soon as Claude
+    finishes writing it. Each dict has 'name', 'search_query', 'category'
+    and 'why'. Claude does NOT provide coordinates (it hallucinates them).
+    
+    The static instructions go in a cached system block; only the small
+    city/vibe/count message changes per call. Results are cached in Redis,
+    so popular trips prewarmed by prewarm.py skip the Claude call entirely.
+    """
+    cache_key = candidates_cache_key(city, vibe, num_places)
+    cached = (await cache_get_many([cache_key]))[0]
+    if cached:
+        for candidate in cached:
+            yield candidate
+        return
+    
+    parser = CandidateStreamParser()
+    candidates = []
+    try:
+        async with client.messages.stream(
+            **build_message_params(city, vibe, num_places)
+        ) as stream:
+            async for text in stream.text_stream:
+                for candidate in parser.feed(text):
+                    candidates.append(candidate)
+                    yield candidate
+            stop_reason = (await stream.get_final_message()).stop_reason
     except Exception as e:
         print(f"Claude API error: {e}")
-        return []
+        return
+    
+    if not candidates:
+        print("JSON parsing error: no places found in response")
+        return
+    
+    # Places already yielded are still used, but a partial list must not be
+    # served from the cache for a week
+    if stop_reason == "max_tokens" or not parser.complete or parser.skipped:
+        print(
+            f"WARNING: Incomplete candidate response (stop_reason={stop_reason}, "
+            f"closed={parser.complete}, skipped={parser.skipped}) - not caching "
+            f"{len(candidates)} places"
+        )
+        return
+    
+    await cache_set(cache_key, candidates, CANDIDATES_CACHE_TTL_SECONDS)
+
+
+async def generate_candidates(city: str, vibe: str = "", num_places: int = 10) -> list[dict]:
+    """
+    Call Claude to generate candidate places for a city.
+    Returns the full list; see stream_candidates to consume places as they arrive.
+    """
+    return [candidate async for candidate in stream_candidates(city, vibe, num_places)]
 
 
 # For testing
 if __name__ == "__main__":
-    results = generate_candidates("Tokyo", "foodie")
+    results = asyncio.run(generate_candidates("Tokyo", "foodie"))
     print(json.dumps(results, indent=2))
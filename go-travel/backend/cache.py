@@ -0,0 +1,116 @@
+"""
+Cache Layer - Shared Redis client for upstream API responses
+=============================================================
+Caches results from slow/billed upstream APIs (Google Places, etc.) so that
+repeat queries for popular cities skip the network entirely.
+
+A small in-process LRU sits in front of Redis, so repeat lookups within one
+worker skip the Redis round-trip too. Redis is optional: if REDIS_URL is not
+set, or Redis is unreachable, only the in-process layer is used.
+
+Author: go. travel planner
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+import orjson
+import redis.asyncio as redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+_client: Optional[redis.Redis] = None
+
+# In-process L1 layer: key -> (expires_at, encoded value). Values are kept
+# as orjson bytes so callers can't mutate a cached entry in place.
+LOCAL_CACHE_MAX_ENTRIES = 2048
+LOCAL_CACHE_TTL_SECONDS = 3600
+_local: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+
+def get_client() -> Optional[redis.Redis]:
+    """Return the shared Redis client, or None if caching is disabled."""
+    global _client
+    if not REDIS_URL:
+        return None
+    if _client is None:
+        _client = redis.from_url(REDIS_URL)
+    return _client
+
+
+def _local_get(key: str) -> Optional[bytes]:
+    entry = _local.get(key)
+    if entry is None:
+        return None
+    expires_at, raw = entry
+    if expires_at < time.monotonic():
+        del _local[key]
+        return None
+    _local.move_to_end(key)
+    return raw
+
+
+def _local_set(key: str, raw: bytes, ttl_seconds: int) -> None:
+    _local[key] = (time.monotonic() + min(ttl_seconds, LOCAL_CACHE_TTL_SECONDS), raw)
+    _local.move_to_end(key)
+    while len(_local) > LOCAL_CACHE_MAX_ENTRIES:
+        _local.popitem(last=False)
+
+
+async def cache_get_many(keys: List[str]) -> List[Optional[Any]]:
+    """
+    Fetch several cached JSON values, checking the in-process layer first
+    and sending the rest to Redis in a single MGET round-trip.
+    
+    Returns a list aligned with `keys`; missing entries (or any Redis
+    failure) come back as None.
+    """
+    raw_values = [_local_get(key) for key in keys]
+    missing = [i for i, raw in enumerate(raw_values) if raw is None]
+    
+    client = get_client()
+    if client is not None and missing:
+        try:
+            fetched = await client.mget([keys[i] for i in missing])
+        except Exception as e:
+            print(f"WARNING: Redis MGET failed, skipping cache: {e}")
+            fetched = [None] * len(missing)
+        for i, raw in zip(missing, fetched):
+            if raw is not None:
+                raw_values[i] = raw
+                _local_set(keys[i], raw, LOCAL_CACHE_TTL_SECONDS)
+    
+    values = []
+    for raw in raw_values:
+        if raw is None:
+            values.append(None)
+            continue
+        try:
+            values.append(orjson.loads(raw))
+        except orjson.JSONDecodeError:
+            values.append(None)
+    return values
+
+
+async def cache_set(key: str, value: Any, ttl_seconds: int) -> None:
+    """Store a JSON-serializable value with an expiry. Failures are logged, not raised."""
+    try:
+        raw = orjson.dumps(value)
+    except TypeError as e:
+        print(f"WARNING: Cannot cache {key}: {e}")
+        return
+    _local_set(key, raw, ttl_seconds)
+    
+    client = get_client()
+    if client is None:
+        return
+    
+    try:
+        await client.set(key, raw, ex=ttl_seconds)
+    except Exception as e:
+        print(f"WARNING: Redis SET failed for {key}: {e}")
@@ -0,0 +1,86 @@
+"""
+HTTP Sessions - Shared aiohttp sessions, one per event loop
+============================================================
+An aiohttp session is bound to the event loop that created it, but the
+modules that share one (Places, weather) are used from more than one loop:
+the app's loop, scripts that call asyncio.run more than once, and the
+weather module's background sync loop.
+
+LoopSessions keeps one session per running loop instead of swapping a single
+global between them, and closes each session when its loop shuts down, so a
+loop that goes away never leaves an unclosed session (and its pooled
+sockets) behind.
+
+Author: go. travel planner
+"""
+
+import asyncio
+import threading
+from typing import Callable, Dict, Tuple
+
+import aiohttp
+
+
+class LoopSessions:
+    """
+    One aiohttp session per event loop, created on first use in that loop.
+
+    Each session gets a closer task on its loop. asyncio.run cancels pending
+    tasks before closing the loop, which runs the closer and closes the
+    session while the loop can still await it. Loops that are closed without
+    cancelling their tasks must call close() themselves (e.g. on app
+    shutdown).
+    """
+
+    def __init__(self, make_session: Callable[[], aiohttp.ClientSession]):
+        """
+        Args:
+            make_session: Builds a new session; called on the loop that will use it
+        """
+        self._make_session = make_session
+        self._entries: Dict[asyncio.AbstractEventLoop, Tuple[aiohttp.ClientSession, asyncio.Task]] = {}
+        # Loops on different threads (e.g. the weather sync loop) share the dict
+        self._lock = threading.Lock()
+
+    async def get(self) -> aiohttp.ClientSession:
+        """Return the running loop's session, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._entries.get(loop)
+            if entry is not None:
+                session, closer = entry
+                if not session.closed:
+                    return session
+                closer.cancel()
+            session = self._make_session()
+            closer = loop.create_task(self._close_on_shutdown(loop, session))
+            self._entries[loop] = (session, closer)
+        # Let the closer start waiting: a task cancelled before its first
+        # step never runs its finally block, and the session would leak
+        await asyncio.sleep(0)
+        return session
+
+    async def close(self) -> None:
+        """Close the running loop's session, if it has one."""
+        with self._lock:
+            entry = self._entries.get(asyncio.get_running_loop())
+        if entry is not None:
+            closer = entry[1]
+            closer.cancel()
+            await asyncio.wait([closer])
+
+    async def _close_on_shutdown(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        session: aiohttp.ClientSession
+    ) -> None:
+        """Wait until cancelled (close() or loop shutdown), then close the session."""
+        try:
+            await loop.create_future()
+        finally:
+            with self._lock:
+                entry = self._entries.get(loop)
+                if entry is not None and entry[0] is session:
+                    del self._entries[loop]
+            if not session.closed:
+                await session.close()
@@ -1,23 +1,58 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
-from datetime import datetime
+from datetime import date
+import asyncio
 import os
+import numpy as np
 from dotenv import load_dotenv
 
-from agents import generate_candidates
-from places_api import enrich_candidates, get_photo_url
+from agents import stream_candidates, candidate_count, check_system_prompt_cacheable
+from places_api import enrich_candidate_stream, get_photo_url, get_session, warm_session, close_session
 from scoring import rank_places
-from weather import fetch_weather
+from weather import fetch_weather, close_weather_session
 from solver import solve_itinerary
-from response_models import format_itinerary_response, format_error_response
+from response_models import (
+    ItineraryResponse,
+    format_itinerary_response,
+    format_error_response,
+    serialize_itinerary_msgpack,
+)
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Python 3.12+: tasks start running immediately, so cache-hit lookups
+    # finish without an extra event-loop hop
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+    
+    # Open the shared Places session on the server's loop before the first
+    # request, and pre-open connections in the background (doesn't block startup)
+    await get_session()
+    warm_task = asyncio.create_task(warm_session())
+    # Warn (in the background) if the cached system prompt is too short to cache
+    prompt_check_task = asyncio.create_task(check_system_prompt_cacheable())
+    yield
+    warm_task.cancel()
+    prompt_check_task.cancel()
+    # Release pooled Places and weather connections on shutdown
+    await close_session()
+    await close_weather_session()
+
 # Initialize FastAPI app
-app = FastAPI(title="go. API", version="0.2.0")
+# ORJSONResponse serializes the large itinerary dicts much faster than stdlib json
+app = FastAPI(
+    title="go. API",
+    version="0.2.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # CORS Configuration - Allow all for hackathon speed
 app.add_middleware(
@@ -35,95 +70,118 @@ class TripRequest(BaseModel):
     end_date: str
     vibe: Optional[str] = ""
 
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+def build_response(data: Dict[str, Any], wants_msgpack: bool) -> Response:
+    """Encode a response dict as MessagePack for service callers, JSON otherwise."""
+    if wants_msgpack:
+        return Response(serialize_itinerary_msgpack(data), media_type=MSGPACK_MEDIA_TYPE)
+    return ORJSONResponse(data)
+
 # Root endpoint
 @app.get("/")
 async def root():
     return {"status": "go. online", "version": "0.2.0"}
 
 # Generate trip endpoint - THE MAIN ENDPOINT
-@app.post("/generate")
-async def generate_trip(request: TripRequest):
+# Handlers return Response instances directly: FastAPI then skips its
+# jsonable_encoder walk of the itinerary dict, and nothing validates it.
+# ItineraryResponse is listed under `responses` to document the schema in
+# OpenAPI only. Other backend services can send "Accept: application/msgpack"
+# to get the same payload as MessagePack.
+@app.post("/generate", responses={200: {"model": ItineraryResponse}})
+async def generate_trip(request: TripRequest, http_request: Request):
     """
     Generate a full multi-day itinerary for a city.
     
     Pipeline:
-    1. Claude generates candidate places (agents.py)
-    2. Google Places enriches with real coordinates (places_api.py)
-    3. Weather API fetches current conditions (weather.py)
-    4. Scoring ranks places by utility (scoring.py)
-    5. OR-Tools solver optimizes multi-day routes (solver.py)
-    6. Response formatter structures output (response_models.py)
+    1. Claude streams candidate places (agents.py)
+    2. Google Places enriches each one with real coordinates as it arrives
+       (places_api.py), while the Weather API fetches conditions (weather.py)
+    3. Scoring ranks places by utility (scoring.py)
+    4. OR-Tools solver optimizes multi-day routes (solver.py)
+    5. Response formatter structures output (response_models.py)
     """
+    wants_msgpack = MSGPACK_MEDIA_TYPE in http_request.headers.get("accept", "")
     
     try:
         # Calculate trip duration
         try:
-            start = datetime.strptime(request.start_date, "%Y-%m-%d")
-            end = datetime.strptime(request.end_date, "%Y-%m-%d")
+            start = date.fromisoformat(request.start_date)
+            end = date.fromisoformat(request.end_date)
             num_days = max(1, (end - start).days + 1)
         except ValueError:
             num_days = 3  # Default fallback
         
         # Scale places based on trip length: 6 places per day, min 6, max 30
-        num_places = min(30, max(6, num_days * 6))
+        num_places = candidate_count(num_days)
         
         print(f"[go.] Generating {num_places} places for {num_days}-day trip to {request.city}")
         
-        # ===== STEP 1: Generate candidates with Claude =====
-        print("[go.] Step 1: Generating candidates with Claude...")
-        candidates = generate_candidates(
-            city=request.city,
-            vibe=request.vibe or "",
-            num_places=num_places
+        # ===== STEP 1+2: Stream candidates from Claude into Google Places (+ weather in parallel) =====
+        # Each place is enriched as soon as Claude finishes writing it, and
+        # weather only needs the city, so all three overlap
+        print("[go.] Step 1: Streaming candidates from Claude into Google Places and fetching weather...")
+        enriched_places, weather = await asyncio.gather(
+            enrich_candidate_stream(
+                stream_candidates(
+                    city=request.city,
+                    vibe=request.vibe or "",
+                    num_places=num_places
+                )
+            ),
+            fetch_weather(request.city),
+            return_exceptions=True,
         )
         
-        if not candidates:
-            return format_error_response(
+        if isinstance(weather, Exception):
+            print(f"[go.] WARNING: Weather fetch failed: {weather}")
+            weather = None
+        if weather:
+            print(f"[go.] Weather: {weather.get('temp', '?')}°C, {weather.get('description', 'unknown')}")
+        
+        if isinstance(enriched_places, Exception):
+            print(f"[go.] ERROR: Candidate generation failed: {enriched_places}")
+            enriched_places = []
+        
+        if not enriched_places:
+            return build_response(format_error_response(
                 error_message="Failed to generate place recommendations. Please try again.",
                 city=request.city,
                 vibe=request.vibe or ""
-            )
-        
-        print(f"[go.] Generated {len(candidates)} candidates")
-        
-        # ===== STEP 2: Enrich with Google Places =====
-        print("[go.] Step 2: Enriching with Google Places API...")
-        enriched_places = await enrich_candidates(candidates)
+            ), wants_msgpack)
         
         # Add photo URLs
         for place in enriched_places:
             if place.get("photo_reference"):
                 place["photo_url"] = get_photo_url(place["photo_reference"])
         
-        print(f"[go.] Enriched {len(enriched_places)} places with coordinates")
+        print(f"[go.] Generated and enriched {len(enriched_places)} places")
         
-        # ===== STEP 3: Fetch weather =====
-        print("[go.] Step 3: Fetching weather data...")
-        weather = await fetch_weather(request.city)
-        if weather:
-            print(f"[go.] Weather: {weather.get('temp', '?')}°C, {weather.get('description', 'unknown')}")
-        
-        # ===== STEP 4: Score and rank places =====
-        print("[go.] Step 4: Scoring and ranking places...")
+        # ===== STEP 3: Score and rank places =====
+        print("[go.] Step 3: Scoring and ranking places...")
         scored_places = rank_places(enriched_places, weather=weather)
         print(f"[go.] {len(scored_places)} places passed scoring threshold")
         
         if not scored_places:
-            return format_error_response(
+            return build_response(format_error_response(
                 error_message="No places met the quality threshold. Try a different vibe.",
                 city=request.city,
                 vibe=request.vibe or ""
-            )
+            ), wants_msgpack)
         
-        # ===== STEP 5: Solve multi-day itinerary =====
-        print("[go.] Step 5: Optimizing multi-day itinerary with OR-Tools...")
+        # ===== STEP 4: Solve multi-day itinerary =====
+        print("[go.] Step 4: Optimizing multi-day itinerary with OR-Tools...")
         
         # Calculate hotel coords (centroid of places)
-        valid_coords = [(p["lat"], p["lng"]) for p in scored_places if p.get("lat") and p.get("lng")]
-        if valid_coords:
-            hotel_lat = sum(c[0] for c in valid_coords) / len(valid_coords)
-            hotel_lng = sum(c[1] for c in valid_coords) / len(valid_coords)
-            hotel_coords = (hotel_lat, hotel_lng)
+        coords = np.fromiter(
+            (v for p in scored_places if p.get("lat") and p.get("lng") for v in (p["lat"], p["lng"])),
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        if coords.size:
+            hotel_lat, hotel_lng = coords.mean(axis=0)
+            hotel_coords = (float(hotel_lat), float(hotel_lng))
         else:
             hotel_coords = None
         
@@ -137,8 +195,8 @@ async def generate_trip(request: TripRequest):
         total_places = sum(d["num_places"] for d in solver_output)
         print(f"[go.] Solver assigned {total_places} places across {num_days} days")
         
-        # ===== STEP 6: Format response =====
-        print("[go.] Step 6: Formatting response...")
+        # ===== STEP 5: Format response =====
+        print("[go.] Step 5: Formatting response...")
         response = format_itinerary_response(
             city=request.city,
             vibe=request.vibe or "",
@@ -151,17 +209,17 @@ async def generate_trip(request: TripRequest):
         )
         
         print(f"[go.] ✓ Itinerary complete!")
-        return response
+        return build_response(response, wants_msgpack)
         
     except Exception as e:
         print(f"[go.] ERROR: {str(e)}")
         import traceback
         traceback.print_exc()
-        return format_error_response(
+        return build_response(format_error_response(
             error_message=f"An error occurred: {str(e)}",
             city=request.city,
             vibe=request.vibe or ""
-        )
+        ), wants_msgpack)
 
 # Health check endpoint
 @app.get("/health")
@@ -4,36 +4,160 @@ Enrichment Layer - Google Places API (New) for real coordinates and data
 
 import asyncio
 import aiohttp
+import functools
+import hashlib
+import numpy as np
+import orjson
 import os
+import random
+import weakref
+from collections import defaultdict
 from dotenv import load_dotenv
-from typing import Optional
+from typing import AsyncIterator, Optional
+
+from cache import cache_get_many, cache_set
+from http_session import LoopSessions
 
 load_dotenv()
 
 GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
 PLACES_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
 
+# Places results are effectively static for a given query; cache for 48 hours
+PLACES_CACHE_TTL_SECONDS = 172800
+
+# Only the fields enrichment actually reads. Opening hours bump the request
+# to a pricier SKU, so they are a separate mask callers can opt out of.
+PLACES_FIELD_MASK = "places.id,places.formattedAddress,places.location,places.rating,places.userRatingCount,places.types,places.photos.name"
+PLACES_FIELD_MASK_WITH_HOURS = PLACES_FIELD_MASK + ",places.regularOpeningHours.periods"
+
+# Request headers never change per call, so build them once
+PLACES_HEADERS = {
+    "Content-Type": "application/json",
+    "X-Goog-Api-Key": GOOGLE_PLACES_API_KEY or "",
+    "X-Goog-FieldMask": PLACES_FIELD_MASK,
+}
+PLACES_HEADERS_WITH_HOURS = {**PLACES_HEADERS, "X-Goog-FieldMask": PLACES_FIELD_MASK_WITH_HOURS}
+
+# Max in-flight Places requests (avoids 429s when fanning out 30 candidates)
+# Tune against your Places QPS quota with the PLACES_MAX_CONCURRENCY env var
+PLACES_MAX_CONCURRENCY = int(os.getenv("PLACES_MAX_CONCURRENCY", "10"))
+
+# Mock coordinates used when GOOGLE_PLACES_API_KEY is unset (central Tokyo)
+MOCK_ORIGIN = (35.6762, 139.6503)
+MOCK_STEP = 0.01
+
+# Connections to pre-open at startup (see warm_session)
+PLACES_WARM_URL = "https://places.googleapis.com/"
+PLACES_WARM_CONNECTIONS = 2
+
+# Retry policy for transient Places failures (rate limits, 5xx, network errors)
+PLACES_MAX_ATTEMPTS = 4
+PLACES_RETRY_BASE_DELAY = 0.2  # Seconds; doubles each attempt (Retry-After wins if sent)
+PLACES_RETRY_MAX_DELAY = 5.0
+PLACES_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Per-attempt timeout; a short connect timeout fails fast on a dead pooled connection
+PLACES_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=5, connect=1)
+
+# Overall budget for one place lookup, including retries. Past this the
+# place is kept without coordinates rather than holding up the itinerary.
+PLACES_LOOKUP_TIMEOUT_SECONDS = 10.0
+
+
+def _make_session() -> aiohttp.ClientSession:
+    """Build a Places session; called once per event loop by _sessions."""
+    return aiohttp.ClientSession(
+        # The semaphore is the real cap; size the per-host pool to match so
+        # requests that get past it never queue again inside the connector
+        connector=aiohttp.TCPConnector(
+            limit=0,
+            limit_per_host=PLACES_MAX_CONCURRENCY,
+            ttl_dns_cache=600,
+            keepalive_timeout=60,
+        ),
+        timeout=aiohttp.ClientTimeout(total=8),
+        json_serialize=lambda obj: orjson.dumps(obj).decode(),
+    )
+
+
+# Shared HTTP session so TLS/DNS setup is paid once, not on every request.
+# One per event loop (e.g. scripts that call asyncio.run more than once),
+# each closed when its loop shuts down.
+_sessions = LoopSessions(_make_session)
+
+# Concurrency cap per session; semaphores are bound to one loop just like
+# sessions, and an entry goes away with its session
+_semaphores: "weakref.WeakKeyDictionary[aiohttp.ClientSession, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_query(search_query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries match."""
+    return " ".join(search_query.lower().split())
+
+
+@functools.lru_cache(maxsize=4096)
+def _places_cache_key(search_query: str) -> str:
+    """Build the Redis key for a search query (memoized - popular queries repeat)."""
+    return "places:v2:" + hashlib.sha1(_normalize_query(search_query).encode()).hexdigest()
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Return the running loop's Places session, creating it on first use."""
+    return await _sessions.get()
+
+
+async def close_session() -> None:
+    """Close the running loop's Places session (call on app shutdown)."""
+    await _sessions.close()
+
+
+def _get_semaphore(session: aiohttp.ClientSession) -> asyncio.Semaphore:
+    """Return the concurrency cap for a session, creating it on first use."""
+    semaphore = _semaphores.get(session)
+    if semaphore is None:
+        semaphore = _semaphores[session] = asyncio.Semaphore(PLACES_MAX_CONCURRENCY)
+    return semaphore
+
+
+async def warm_session(num_connections: int = PLACES_WARM_CONNECTIONS) -> None:
+    """
+    Pre-open pooled TLS connections to the Places host (call on app startup)
+    so the first /generate after boot doesn't pay the handshakes.
+    Any response - even a 404 - leaves a keep-alive connection in the pool.
+    """
+    if not GOOGLE_PLACES_API_KEY:
+        return
+    
+    session = await get_session()
+    
+    async def _open_one() -> None:
+        try:
+            async with session.head(PLACES_WARM_URL):
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"WARNING: Places connection warm-up failed: {type(e).__name__}: {e}")
+    
+    await asyncio.gather(*(_open_one() for _ in range(num_connections)))
+
 
 def parse_opening_hours(regular_hours: Optional[dict]) -> Optional[dict]:
     """
     Parse Google Places regularOpeningHours into a structured format.
     
     Returns dict with:
-    - weekday_text: List of strings like ["Monday: 9:00 AM – 5:00 PM", ...]
     - periods: List of {open: {day, hour, minute}, close: {day, hour, minute}}
-    - by_day: Dict mapping day (0=Sunday) to {open_time, close_time} in minutes from midnight
+    - by_day: 7-slot list indexed by day (0=Sunday); each slot is
+      (open_minutes, close_minutes) from midnight, or None if closed
     """
     if not regular_hours:
         return None
     
-    result = {
-        "weekday_text": regular_hours.get("weekdayDescriptions", []),
-        "periods": [],
-        "by_day": {}  # day -> {open: minutes, close: minutes}
-    }
+    periods = []
+    by_day: list[Optional[tuple[int, int]]] = [None] * 7
     
-    periods = regular_hours.get("periods", [])
-    for period in periods:
+    for period in regular_hours.get("periods", []):
         open_info = period.get("open", {})
         close_info = period.get("close", {})
         
@@ -45,7 +169,7 @@ def parse_opening_hours(regular_hours: Optional[dict]) -> Optional[dict]:
         close_hour = close_info.get("hour", 23)
         close_minute = close_info.get("minute", 59)
         
-        result["periods"].append({
+        periods.append({
             "open": {"day": open_day, "hour": open_hour, "minute": open_minute},
             "close": {"day": close_day, "hour": close_hour, "minute": close_minute}
         })
@@ -54,127 +178,275 @@ def parse_opening_hours(regular_hours: Optional[dict]) -> Optional[dict]:
         open_minutes = open_hour * 60 + open_minute
         close_minutes = close_hour * 60 + close_minute
         
-        # Store by day (0=Sunday, 1=Monday, ..., 6=Saturday)
-        if open_day not in result["by_day"]:
-            result["by_day"][open_day] = {"open": open_minutes, "close": close_minutes}
-        else:
-            # Some places have multiple periods per day (e.g., lunch and dinner)
-            existing = result["by_day"][open_day]
-            result["by_day"][open_day] = {
-                "open": min(existing["open"], open_minutes),
-                "close": max(existing["close"], close_minutes)
-            }
+        # Some places have multiple periods per day (e.g., lunch and dinner)
+        slot = by_day[open_day]
+        by_day[open_day] = (
+            (open_minutes, close_minutes) if slot is None
+            else (min(slot[0], open_minutes), max(slot[1], close_minutes))
+        )
     
-    return result
+    return {
+        "periods": periods,
+        "by_day": by_day,
+    }
 
 
-async def fetch_place_details(session: aiohttp.ClientSession, search_query: str) -> Optional[dict]:
+async def fetch_place_details(
+    session: aiohttp.ClientSession,
+    search_query: str,
+    include_hours: bool = True,
+) -> Optional[dict]:
     """
     Fetch a single place from Google Places API (New) Text Search.
-    Returns place with coordinates and opening hours.
+    Returns place with coordinates and (optionally) opening hours.
+    
+    Successful results are written through to the Redis cache; callers
+    check the cache first so only misses reach this function. Results
+    fetched without hours are not cached, so later lookups still get them.
     """
-    headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": GOOGLE_PLACES_API_KEY,
-        "X-Goog-FieldMask": "places.id,places.displayName,places.formattedAddress,places.location,places.rating,places.userRatingCount,places.currentOpeningHours,places.regularOpeningHours,places.priceLevel,places.types,places.photos"
-    }
+    headers = PLACES_HEADERS_WITH_HOURS if include_hours else PLACES_HEADERS
     
-    payload = {
+    # Encode once up front (reused across retries) and send the bytes as-is;
+    # headers already carry Content-Type: application/json
+    body = orjson.dumps({
         "textQuery": search_query,
         "maxResultCount": 1
-    }
+    })
     
     try:
-        async with session.post(PLACES_SEARCH_URL, headers=headers, json=payload) as response:
-            data = await response.json()
-            
-            if not data.get("places"):
-                print(f"No results for: {search_query}")
-                return None
-            
-            place = data["places"][0]  # Get top result
-            
-            # Extract the data we need
-            enriched = {
-                "place_id": place.get("id"),
-                "formatted_address": place.get("formattedAddress"),
-                "lat": place.get("location", {}).get("latitude"),
-                "lng": place.get("location", {}).get("longitude"),
-                "rating": place.get("rating"),
-                "user_ratings_total": place.get("userRatingCount"),
-                "open_now": place.get("currentOpeningHours", {}).get("openNow"),
-                "opening_hours": parse_opening_hours(place.get("regularOpeningHours")),
-                "price_level": place.get("priceLevel"),
-                "types": place.get("types", []),
-                "photo_reference": None
-            }
-            
-            # Get photo reference if available
-            if place.get("photos"):
-                # New API uses photo resource name
-                enriched["photo_reference"] = place["photos"][0].get("name")
-            
-            return enriched
-            
+        # Deadline covers all retries, so one stuck place can't stall the batch
+        data = await asyncio.wait_for(
+            _post_with_retry(session, headers, body, search_query),
+            timeout=PLACES_LOOKUP_TIMEOUT_SECONDS,
+        )
+        if data is None:
+            return None
+        
+        if not data.get("places"):
+            print(f"No results for: {search_query}")
+            return None
+        
+        place = data["places"][0]  # Get top result
+        
+        # Extract the data we need
+        enriched = {
+            "place_id": place.get("id"),
+            "formatted_address": place.get("formattedAddress"),
+            "lat": place.get("location", {}).get("latitude"),
+            "lng": place.get("location", {}).get("longitude"),
+            "rating": place.get("rating"),
+            "user_ratings_total": place.get("userRatingCount"),
+            "opening_hours": parse_opening_hours(place.get("regularOpeningHours")),
+            "types": place.get("types", []),
+            "photo_reference": None
+        }
+        
+        # Get photo reference if available
+        if place.get("photos"):
+            # New API uses photo resource name
+            enriched["photo_reference"] = place["photos"][0].get("name")
+        
+        if include_hours:
+            await cache_set(_places_cache_key(search_query), enriched, PLACES_CACHE_TTL_SECONDS)
+        
+        return enriched
+        
+    except asyncio.TimeoutError:
+        print(f"Timed out after {PLACES_LOOKUP_TIMEOUT_SECONDS}s fetching place: {search_query}")
+        return None
     except Exception as e:
         print(f"Error fetching place '{search_query}': {e}")
         return None
 
 
-async def enrich_candidates(candidates: list[dict]) -> list[dict]:
+async def _post_with_retry(
+    session: aiohttp.ClientSession,
+    headers: dict,
+    body: bytes,
+    search_query: str,
+) -> Optional[dict]:
+    """
+    POST a Text Search request, retrying 429/5xx responses and network errors
+    with exponential backoff. Other errors (e.g. 400 for a bad query) fail
+    on the first try. Returns the parsed JSON body ({} for no results), or
+    None on failure.
+    """
+    for attempt in range(1, PLACES_MAX_ATTEMPTS + 1):
+        try:
+            async with _get_semaphore(session), session.post(
+                PLACES_SEARCH_URL, headers=headers, data=body, timeout=PLACES_REQUEST_TIMEOUT
+            ) as response:
+                retry_after = None
+                if response.status in PLACES_RETRY_STATUSES and attempt < PLACES_MAX_ATTEMPTS:
+                    error = f"HTTP {response.status}"
+                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                    await response.read()  # Drain so the connection goes back to the pool
+                else:
+                    raw = await response.read()
+                    if response.status != 200:
+                        print(f"WARNING: Places API returned {response.status} for: {search_query}")
+                        return None
+                    # "No results" is a bare {} - skip the parse entirely
+                    if b'"places"' not in raw:
+                        return {}
+                    try:
+                        return orjson.loads(raw)
+                    except orjson.JSONDecodeError:
+                        print(f"Invalid JSON from Places API for: {search_query}")
+                        return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == PLACES_MAX_ATTEMPTS:
+                print(f"Error fetching place '{search_query}': {type(e).__name__}: {e}")
+                return None
+            error = f"{type(e).__name__}: {e}"
+            retry_after = None
+        
+        # Back off outside the semaphore so other lookups keep the slot
+        if retry_after is not None:
+            delay = min(PLACES_RETRY_MAX_DELAY, retry_after)
+        else:
+            delay = min(PLACES_RETRY_MAX_DELAY, PLACES_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+            delay += random.uniform(0, delay / 2)  # Jitter so retries don't sync up
+        print(f"WARNING: Places request failed ({error}) for: {search_query} - retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+    
+    return None
+
+
+def mock_coordinates(count: int) -> np.ndarray:
+    """(count, 2) array of deterministic mock (lat, lng) pairs stepping away from MOCK_ORIGIN."""
+    return np.asarray(MOCK_ORIGIN) + (np.arange(count, dtype=np.float64) * MOCK_STEP)[:, None]
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds (HTTP-date form is ignored)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _mock_place_data(candidate: dict, i: int, lat: float, lng: float) -> dict:
+    """Mock Places data for development without an API key."""
+    return {
+        "place_id": f"mock_place_{i}",
+        "formatted_address": f"{candidate['name']}, {candidate.get('search_query', '')}",
+        "lat": lat,
+        "lng": lng,
+        "rating": 4.5,
+        "user_ratings_total": 1000,
+        "opening_hours": None,  # unknown hours - solver uses category windows
+        "photo_reference": None
+    }
+
+
+def _merge_place_data(candidate: dict, place_data: Optional[dict]) -> dict:
+    """
+    Merge Places data into a candidate in place, keeping it (without
+    coordinates) if enrichment failed. Candidates are owned by the
+    pipeline, so updating them avoids allocating a merged copy each.
+    """
+    if place_data:
+        candidate.update(place_data)
+        return candidate
+    
+    # Keep original candidate even if enrichment failed
+    candidate.update({
+        "lat": None,
+        "lng": None,
+        "formatted_address": None,
+        "rating": None
+    })
+    return candidate
+
+
+async def enrich_candidates(candidates: list[dict], include_hours: bool = True) -> list[dict]:
     """
     Enrich a list of candidates with Google Places data.
-    Uses asyncio.gather for parallel requests (fast!).
+    Checks the Redis cache with a single MGET first, then uses asyncio.gather
+    for parallel requests on the misses (fast!).
     
     Input: List of dicts with 'name', 'search_query', 'category', 'why'
     Output: Same list enriched with lat, lng, rating, address, etc.
+    Pass include_hours=False to skip opening hours (cheaper Places SKU).
     """
     
     if not GOOGLE_PLACES_API_KEY:
         print("WARNING: GOOGLE_PLACES_API_KEY not set. Returning mock coordinates.")
         # Return mock data for development
-        for i, candidate in enumerate(candidates):
-            candidate.update({
-                "place_id": f"mock_place_{i}",
-                "formatted_address": f"{candidate['name']}, {candidate.get('search_query', '')}",
-                "lat": 35.6762 + (i * 0.01),  # Mock coordinates
-                "lng": 139.6503 + (i * 0.01),
-                "rating": 4.5,
-                "user_ratings_total": 1000,
-                "opening_hours": True,
-                "price_level": 2,
-                "photo_reference": None
-            })
+        coords = mock_coordinates(len(candidates)).tolist()
+        for i, (candidate, (lat, lng)) in enumerate(zip(candidates, coords)):
+            candidate.update(_mock_place_data(candidate, i, lat, lng))
         return candidates
     
-    async with aiohttp.ClientSession() as session:
-        # Create tasks for parallel fetching
-        tasks = [
-            fetch_place_details(session, candidate["search_query"])
-            for candidate in candidates
-        ]
-        
-        # Fetch all places in parallel
-        results = await asyncio.gather(*tasks)
-        
-        # Merge results back into candidates
-        enriched_candidates = []
-        for candidate, place_data in zip(candidates, results):
-            if place_data:
-                # Merge original candidate data with enriched data
-                enriched = {**candidate, **place_data}
-                enriched_candidates.append(enriched)
-            else:
-                # Keep original candidate even if enrichment failed
-                candidate.update({
-                    "lat": None,
-                    "lng": None,
-                    "formatted_address": None,
-                    "rating": None
-                })
-                enriched_candidates.append(candidate)
-        
-        return enriched_candidates
+    # Batch cache lookup - only misses go to the Places API
+    cache_keys = [_places_cache_key(c["search_query"]) for c in candidates]
+    results = await cache_get_many(cache_keys)
+    
+    # Group misses by normalized query so duplicates cost one Places call
+    misses_by_query: dict[str, list[int]] = defaultdict(list)
+    for i, cached in enumerate(results):
+        if cached is None:
+            misses_by_query[_normalize_query(candidates[i]["search_query"])].append(i)
+    
+    session = await get_session()
+    
+    # Create tasks for parallel fetching (concurrency capped by _get_semaphore)
+    tasks = [
+        fetch_place_details(session, candidates[indices[0]]["search_query"], include_hours)
+        for indices in misses_by_query.values()
+    ]
+    
+    # Fetch all missing places in parallel, then fan each result back out
+    fetched = await asyncio.gather(*tasks)
+    for indices, place_data in zip(misses_by_query.values(), fetched):
+        for i in indices:
+            results[i] = place_data
+    
+    # Merge results back into candidates
+    return [
+        _merge_place_data(candidate, place_data)
+        for candidate, place_data in zip(candidates, results)
+    ]
+
+
+async def _lookup_place(session: aiohttp.ClientSession, search_query: str) -> Optional[dict]:
+    """Cache lookup, falling back to the Places API on a miss."""
+    place_data = (await cache_get_many([_places_cache_key(search_query)]))[0]
+    if place_data is None:
+        place_data = await fetch_place_details(session, search_query)
+    return place_data
+
+
+async def enrich_candidate_stream(candidates: AsyncIterator[dict]) -> list[dict]:
+    """
+    Enrich candidates as they stream in (e.g. from agents.stream_candidates).
+    
+    A Places lookup starts as soon as each candidate arrives, so enrichment
+    overlaps with Claude still generating the rest of the list. Returns the
+    enriched list in arrival order once the stream and all lookups finish.
+    """
+    if not GOOGLE_PLACES_API_KEY:
+        # Mock mode has no lookups to overlap - collect and use the list path,
+        # so mock positions come from mock_coordinates in both
+        return await enrich_candidates([candidate async for candidate in candidates])
+    
+    session = await get_session()
+    
+    # One lookup per normalized query; duplicate candidates share its task.
+    # fetch_place_details never raises, so one failed place doesn't cancel the group
+    arrived = []
+    lookups: dict[str, asyncio.Task] = {}
+    async with asyncio.TaskGroup() as tg:
+        async for candidate in candidates:
+            query = _normalize_query(candidate["search_query"])
+            if query not in lookups:
+                lookups[query] = tg.create_task(_lookup_place(session, candidate["search_query"]))
+            arrived.append((candidate, lookups[query]))
+    
+    return [_merge_place_data(candidate, task.result()) for candidate, task in arrived]
 
 
 def get_photo_url(photo_reference: str, max_width: int = 400) -> str:
@@ -185,22 +457,6 @@ def get_photo_url(photo_reference: str, max_width: int = 400) -> str:
     return f"https://places.googleapis.com/v1/{photo_reference}/media?maxWidthPx={max_width}&key={GOOGLE_PLACES_API_KEY}"
 
 
-# Sync wrapper for use in non-async contexts
-def enrich_candidates_sync(candidates: list[dict]) -> list[dict]:
-    """Synchronous wrapper for enrich_candidates."""
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        # No running loop, safe to use asyncio.run()
-        return asyncio.run(enrich_candidates(candidates))
-    
-    # Already in an event loop - use nest_asyncio or run in executor
-    import concurrent.futures
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future = executor.submit(asyncio.run, enrich_candidates(candidates))
-        return future.result()
-
-
 # For testing
 if __name__ == "__main__":
     import json
@@ -211,5 +467,11 @@ if __name__ == "__main__":
         {"name": "Senso-ji Temple", "search_query": "Senso-ji Temple Asakusa Tokyo", "category": "cultural", "why": "Ancient Buddhist temple."},
     ]
     
-    enriched = enrich_candidates_sync(test_candidates)
+    async def main():
+        try:
+            return await enrich_candidates(test_candidates)
+        finally:
+            await close_session()
+    
+    enriched = asyncio.run(main())
     print(json.dumps(enriched, indent=2))
@@ -0,0 +1,109 @@
+"""
+Prewarm Job - Batch-generate candidates for popular trips
+==========================================================
+Runs offline (e.g. nightly cron) and sends one Message Batches API request
+for every popular (city, vibe) combination. Batched requests are billed at
+half price; results are written to Redis under the same key that
+agents.generate_candidates reads, so /generate skips Claude for these trips.
+
+Usage:
+    python prewarm.py
+
+Author: go. travel planner
+"""
+
+import asyncio
+from typing import List, Tuple
+
+from agents import (
+    client,
+    build_message_params,
+    candidate_count,
+    parse_candidates,
+    candidates_cache_key,
+    CANDIDATES_CACHE_TTL_SECONDS,
+)
+from cache import cache_set, get_client
+
+# (city, vibe) pairs worth keeping warm
+POPULAR_TRIPS: List[Tuple[str, str]] = [
+    ("Tokyo", ""),
+    ("Tokyo", "foodie"),
+    ("Paris", ""),
+    ("Paris", "romantic"),
+    ("New York", ""),
+    ("London", ""),
+    ("Vancouver", ""),
+    ("Vancouver", "nature lover"),
+]
+
+# Candidate counts to prewarm - every count main.py can ask for (1 to 5+ days)
+PREWARM_NUM_PLACES: List[int] = sorted({candidate_count(days) for days in range(1, 6)})
+
+POLL_INTERVAL_SECONDS = 60
+
+
+async def prewarm(
+    trips: List[Tuple[str, str]] = POPULAR_TRIPS,
+    num_places_options: List[int] = PREWARM_NUM_PLACES,
+) -> int:
+    """
+    Generate and cache candidates for every (city, vibe, num_places) combination.
+
+    Args:
+        trips: List of (city, vibe) tuples
+        num_places_options: Candidate counts to generate per trip
+
+    Returns:
+        Number of candidate lists written to the cache
+    """
+    if get_client() is None:
+        print("WARNING: REDIS_URL not set - nothing to prewarm into")
+        return 0
+
+    # custom_id must be short and alphanumeric, so map it back via an index
+    jobs = [
+        (city, vibe, num_places)
+        for city, vibe in trips
+        for num_places in num_places_options
+    ]
+    requests = [
+        {"custom_id": f"trip-{i}", "params": build_message_params(city, vibe, num_places)}
+        for i, (city, vibe, num_places) in enumerate(jobs)
+    ]
+
+    batch = await client.messages.batches.create(requests=requests)
+    print(f"Submitted batch {batch.id} with {len(requests)} requests")
+
+    while batch.processing_status != "ended":
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        batch = await client.messages.batches.retrieve(batch.id)
+        print(f"Batch {batch.id}: {batch.processing_status} {batch.request_counts}")
+
+    written = 0
+    async for entry in await client.messages.batches.results(batch.id):
+        city, vibe, num_places = jobs[int(entry.custom_id.split("-", 1)[1])]
+
+        if entry.result.type != "succeeded":
+            print(f"Skipping {city} ({vibe or 'no vibe'}, {num_places}): {entry.result.type}")
+            continue
+
+        try:
+            candidates = parse_candidates(entry.result.message.content[0].text)
+        except ValueError as e:
+            print(f"Skipping {city} ({vibe or 'no vibe'}, {num_places}): {e}")
+            continue
+
+        await cache_set(
+            candidates_cache_key(city, vibe, num_places),
+            candidates,
+            CANDIDATES_CACHE_TTL_SECONDS,
+        )
+        written += 1
+
+    print(f"Prewarmed {written}/{len(jobs)} candidate lists")
+    return written
+
+
+if __name__ == "__main__":
+    asyncio.run(prewarm())
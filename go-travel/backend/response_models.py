@@ -7,39 +7,33 @@ All itinerary endpoints MUST return data in these formats.
 Author: go. travel planner
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
-from enum import Enum
-
-
-class PlaceCategory(str, Enum):
-    """Supported place categories."""
-    LANDMARK = "landmark"
-    MUSEUM = "museum"
-    RESTAURANT = "restaurant"
-    NATURE = "nature"
-    NIGHTLIFE = "nightlife"
-    SHOPPING = "shopping"
-    CULTURAL = "cultural"
-    CAFE = "cafe"
-    OTHER = "other"
-
-
-class Coordinates(BaseModel):
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Dict, Any, Tuple
+from functools import lru_cache
+from datetime import date, timedelta
+
+import ormsgpack
+
+
+class ResponseModel(BaseModel):
+    """Base for response models: immutable once built, unknown fields rejected."""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+
+class Coordinates(ResponseModel):
     """Geographic coordinates."""
     lat: float = Field(..., description="Latitude")
     lng: float = Field(..., description="Longitude")
 
 
-class TimeSlot(BaseModel):
+class TimeSlot(ResponseModel):
     """Time information for an itinerary item."""
     arrival: str = Field(..., description="Arrival time (e.g., '9:30 AM')")
     departure: str = Field(..., description="Departure time (e.g., '11:00 AM')")
     duration_minutes: int = Field(..., description="Visit duration in minutes")
 
 
-class ItineraryPlace(BaseModel):
+class ItineraryPlace(ResponseModel):
     """
     A single place in the itinerary.
     This is what the frontend displays for each stop.
@@ -59,7 +53,7 @@ class ItineraryPlace(BaseModel):
     low_score_note: Optional[str] = Field(None, description="Explanation if utility score is below 70")
 
 
-class WeatherInfo(BaseModel):
+class WeatherInfo(ResponseModel):
     """Weather information for a day."""
     condition: str = Field(..., description="Weather condition (Clear, Rain, etc.)")
     description: str = Field("", description="Detailed description")
@@ -68,18 +62,7 @@ class WeatherInfo(BaseModel):
     humidity: Optional[int] = Field(None, description="Humidity percentage")
 
 
-class DayPlan(BaseModel):
-    """
-    One day's complete itinerary.
-    """
-    day_number: int = Field(..., description="Day number (1-indexed)")
-    date: Optional[str] = Field(None, description="Actual date if provided (YYYY-MM-DD)")
-    weather: Optional[WeatherInfo] = Field(None, description="Weather for this day")
-    places: List[ItineraryPlace] = Field(default_factory=list)
-    summary: "DaySummary"
-
-
-class DaySummary(BaseModel):
+class DaySummary(ResponseModel):
     """Summary statistics for a single day."""
     num_places: int = Field(..., description="Number of places to visit")
     total_score: float = Field(..., description="Sum of all place scores")
@@ -90,7 +73,18 @@ class DaySummary(BaseModel):
     end_time: Optional[str] = Field(None, description="Last activity end time")
 
 
-class TripSummary(BaseModel):
+class DayPlan(ResponseModel):
+    """
+    One day's complete itinerary.
+    """
+    day_number: int = Field(..., description="Day number (1-indexed)")
+    date: Optional[str] = Field(None, description="Actual date if provided (YYYY-MM-DD)")
+    weather: Optional[WeatherInfo] = Field(None, description="Weather for this day")
+    places: List[ItineraryPlace] = Field(default_factory=list)
+    summary: DaySummary
+
+
+class TripSummary(ResponseModel):
     """Overall trip statistics."""
     city: str = Field(..., description="Destination city")
     num_days: int = Field(..., description="Number of days")
@@ -102,7 +96,7 @@ class TripSummary(BaseModel):
     vibe: Optional[str] = Field(None, description="Trip vibe/theme")
 
 
-class ItineraryResponse(BaseModel):
+class ItineraryResponse(ResponseModel):
     """
     THE MAIN RESPONSE FORMAT.
     This is what /generate returns to the frontend.
@@ -142,11 +136,67 @@ class ItineraryResponse(BaseModel):
     hotel: Optional[Coordinates] = Field(None, description="Hotel/starting point")
 
 
-# Update forward reference
-DayPlan.model_rebuild()
+# ========== HELPER FUNCTIONS ==========
 
+# Google type / category sets behind each tag (built once, not per call)
+OUTDOOR_TYPES = frozenset({
+    "park", "natural_feature", "campground", "hiking_area",
+    "beach", "garden", "zoo", "amusement_park", "stadium"
+})
+OUTDOOR_CATEGORIES = frozenset({"nature"})
+
+INDOOR_TYPES = frozenset({
+    "museum", "art_gallery", "library", "aquarium",
+    "movie_theater", "shopping_mall", "spa"
+})
+INDOOR_CATEGORIES = frozenset({"museum", "shopping"})
+
+FAMILY_TYPES = frozenset({
+    "zoo", "aquarium", "amusement_park", "park",
+    "museum", "bowling_alley", "playground"
+})
+
+FOOD_TYPES = frozenset({"restaurant", "cafe", "bakery", "bar", "meal_takeaway"})
+FOOD_CATEGORIES = frozenset({"restaurant", "cafe", "breakfast", "brunch", "lunch", "dinner"})
+
+NIGHTLIFE_TYPES = frozenset({"night_club", "bar", "casino"})
+NIGHTLIFE_CATEGORIES = frozenset({"nightlife", "club", "bar"})
+
+CULTURAL_TYPES = frozenset({
+    "church", "hindu_temple", "mosque", "synagogue",
+    "museum", "art_gallery", "tourist_attraction"
+})
+CULTURAL_CATEGORIES = frozenset({"cultural", "landmark"})
+
+# Parks are usually free
+FREE_TYPES = frozenset({"park", "beach", "plaza", "town_square"})
+
+
+# Tags in output order, each with the Google types / categories that imply it
+TAG_RULES = [
+    ("outdoor", OUTDOOR_TYPES, OUTDOOR_CATEGORIES),
+    ("indoor", INDOOR_TYPES, INDOOR_CATEGORIES),
+    ("family-friendly", FAMILY_TYPES, frozenset()),
+    ("food & drink", FOOD_TYPES, FOOD_CATEGORIES),
+    ("nightlife", NIGHTLIFE_TYPES, NIGHTLIFE_CATEGORIES),
+    ("cultural", CULTURAL_TYPES, CULTURAL_CATEGORIES),
+    ("free", FREE_TYPES, frozenset()),
+]
+
+
+def _build_tag_bits(index: int) -> Dict[str, int]:
+    """Map each type (index=1) or category (index=2) to a bitmask of the tags it implies."""
+    bits: Dict[str, int] = {}
+    for bit, rule in enumerate(TAG_RULES):
+        for key in rule[index]:
+            bits[key] = bits.get(key, 0) | (1 << bit)
+    return bits
+
+
+_TYPE_TO_TAG_BITS = _build_tag_bits(1)
+_CATEGORY_TO_TAG_BITS = _build_tag_bits(2)
+_BIT_TO_TAG = [(1 << bit, rule[0]) for bit, rule in enumerate(TAG_RULES)]
 
-# ========== HELPER FUNCTIONS ==========
 
 def derive_tags(google_types: list, category: str) -> List[str]:
     """
@@ -154,61 +204,34 @@ def derive_tags(google_types: list, category: str) -> List[str]:
     
     Google types: https://developers.google.com/maps/documentation/places/web-service/supported_types
     """
-    tags = []
-    google_types_set = set(google_types) if google_types else set()
-    
-    # Outdoor tags
-    outdoor_types = {
-        "park", "natural_feature", "campground", "hiking_area",
-        "beach", "garden", "zoo", "amusement_park", "stadium"
-    }
-    if google_types_set & outdoor_types or category in ["nature"]:
-        tags.append("outdoor")
-    
-    # Indoor tags
-    indoor_types = {
-        "museum", "art_gallery", "library", "aquarium",
-        "movie_theater", "shopping_mall", "spa"
-    }
-    if google_types_set & indoor_types or category in ["museum", "shopping"]:
-        tags.append("indoor")
-    
-    # Family-friendly
-    family_types = {
-        "zoo", "aquarium", "amusement_park", "park",
-        "museum", "bowling_alley", "playground"
-    }
-    if google_types_set & family_types:
-        tags.append("family-friendly")
-    
-    # Food & drink
-    food_types = {
-        "restaurant", "cafe", "bakery", "bar", "meal_takeaway"
-    }
-    if google_types_set & food_types or category in ["restaurant", "cafe", "breakfast", "brunch", "lunch", "dinner"]:
-        tags.append("food & drink")
-    
-    # Nightlife
-    nightlife_types = {
-        "night_club", "bar", "casino"
-    }
-    if google_types_set & nightlife_types or category in ["nightlife", "club", "bar"]:
-        tags.append("nightlife")
-    
-    # Cultural/Historical
-    cultural_types = {
-        "church", "hindu_temple", "mosque", "synagogue",
-        "museum", "art_gallery", "tourist_attraction"
-    }
-    if google_types_set & cultural_types or category in ["cultural", "landmark"]:
-        tags.append("cultural")
-    
-    # Free (parks are usually free)
-    free_types = {"park", "beach", "plaza", "town_square"}
-    if google_types_set & free_types:
-        tags.append("free")
-    
-    return tags
+    return list(_derive_tags_cached(tuple(google_types or ()), category))
+
+
+@lru_cache(maxsize=2048)
+def _derive_tags_cached(google_types: Tuple[str, ...], category: str) -> Tuple[str, ...]:
+    """
+    Memoized core of derive_tags - places of the same kind share identical
+    type lists, so most calls are a single cache hit. Returns a tuple so the
+    cached value can't be mutated by callers.
+    """
+    # OR together the tag bits of every type plus the category, then decode once
+    bits = _CATEGORY_TO_TAG_BITS.get(category, 0)
+    for google_type in google_types:
+        bits |= _TYPE_TO_TAG_BITS.get(google_type, 0)
+    
+    return tuple(tag for mask, tag in _BIT_TO_TAG if bits & mask)
+
+
+# Why a lower-rated place is still worth it, keyed by lower-cased category
+_CATEGORY_REASONS: Dict[str, str] = {
+    "nature": "but offers unique natural scenery",
+    "cultural": "but has significant cultural/historical value",
+    "landmark": "but is an iconic must-see location",
+    "nightlife": "but is popular among locals",
+    "club": "but has great atmosphere",
+    "bar": "but is known for unique drinks/vibe",
+    "restaurant": "but offers authentic local cuisine",
+}
 
 
 def generate_low_rating_note(
@@ -221,37 +244,29 @@ def generate_low_rating_note(
     Generate an explanation for why a lower-rated place is still included.
     Called when rating < 4.0.
     """
-    notes = []
-    
     if rating >= 3.5:
-        notes.append(f"Rating of {rating:.1f} is decent")
+        rating_text = f"Rating of {rating:.1f} is decent"
     else:
-        notes.append(f"Lower rating ({rating:.1f})")
+        rating_text = f"Lower rating ({rating:.1f})"
     
     # Add context based on category
-    category_reasons = {
-        "nature": "but offers unique natural scenery",
-        "cultural": "but has significant cultural/historical value",
-        "landmark": "but is an iconic must-see location",
-        "nightlife": "but is popular among locals",
-        "club": "but has great atmosphere",
-        "bar": "but is known for unique drinks/vibe",
-        "restaurant": "but offers authentic local cuisine",
-    }
-    
-    if category.lower() in category_reasons:
-        notes.append(category_reasons[category.lower()])
+    category_reason = _CATEGORY_REASONS.get(category.lower()) if category else None
+    if category_reason:
+        context = category_reason
     elif why:
         # Use the "why" from the AI recommendation
-        notes.append(f"but {why.lower()}")
+        context = f"but {why.lower()}"
     else:
-        notes.append("but fits your trip well")
+        context = "but fits your trip well"
     
     # Add vibe match if relevant
     if vibe:
-        notes.append(f"and matches your '{vibe}' vibe")
-    
-    return ", ".join(notes) + "."
+        return f"{rating_text}, {context}, and matches your '{vibe}' vibe."
+    return f"{rating_text}, {context}."
+
+
+# Weather conditions described as wet in low-score notes
+_WET_WEATHER = frozenset({"Rain", "Drizzle", "Thunderstorm"})
 
 
 def generate_low_score_note(
@@ -277,33 +292,30 @@ def generate_low_score_note(
         return None
     
     reasons = []
+    get = score_breakdown.get
     
     # Check distance impact
-    distance_km = score_breakdown.get("distance_km", 0)
-    distance_mult = score_breakdown.get("distance_multiplier", 1.0)
+    distance_km = get("distance_km", 0)
+    distance_mult = get("distance_multiplier", 1.0)
     if distance_km > 10:
         reasons.append(f"farther from city center ({distance_km:.0f}km)")
     elif distance_mult < 0.7:
         reasons.append(f"moderate distance ({distance_km:.1f}km)")
     
     # Check weather impact
-    weather_mult = score_breakdown.get("weather_multiplier", 1.0)
-    is_outdoor = score_breakdown.get("is_outdoor", False)
-    weather_condition = score_breakdown.get("weather_condition")
-    
-    if weather_mult < 1.0 and is_outdoor:
-        if weather_condition in ["Rain", "Drizzle", "Thunderstorm"]:
+    if get("weather_multiplier", 1.0) < 1.0 and get("is_outdoor", False):
+        weather_condition = get("weather_condition")
+        if weather_condition in _WET_WEATHER:
             reasons.append(f"outdoor activity during {weather_condition.lower()}")
         elif weather_condition == "Snow":
             reasons.append("outdoor activity in snowy conditions")
         else:
-            temp = score_breakdown.get("temperature", 20)
+            temp = get("temperature", 20)
             if temp and temp < 5:
                 reasons.append(f"outdoor activity in cold weather ({temp:.0f}°C)")
     
     # Check base rating impact
-    base_score = score_breakdown.get("base_score", 60)
-    if base_score < 70:
+    if get("base_score", 60) < 70:
         reasons.append("lower Google rating")
     
     if not reasons:
@@ -346,85 +358,86 @@ def format_itinerary_response(
     Returns:
         Dict matching ItineraryResponse schema
     """
-    # Calculate totals
-    total_places = sum(day["num_places"] for day in solver_output)
-    total_score = sum(day["total_score"] for day in solver_output)
-    places_dropped = len(original_places) - total_places
+    # Parse start date once; reused for the end date and every day's date
+    start = None
+    if start_date:
+        try:
+            start = date.fromisoformat(start_date)
+        except ValueError:
+            start = None
     
     # Calculate end date if start date provided
     end_date = None
-    if start_date and num_days > 1:
-        try:
-            start = datetime.strptime(start_date, "%Y-%m-%d")
-            end = start + timedelta(days=num_days - 1)
-            end_date = end.strftime("%Y-%m-%d")
-        except:
-            end_date = None
-    elif start_date:
+    if start and num_days > 1:
+        end_date = (start + timedelta(days=num_days - 1)).isoformat()
+    elif start_date and num_days <= 1:
         end_date = start_date
     
-    # Build trip summary
-    trip = {
-        "city": city,
-        "num_days": num_days,
-        "start_date": start_date,
-        "end_date": end_date,
-        "total_places": total_places,
-        "total_score": round(total_score, 1),
-        "places_dropped": places_dropped,
-        "vibe": vibe,
-    }
+    # Weather info is the same for all days currently (future: per-day forecast),
+    # so build it once and share it; nothing mutates it after this point
+    day_weather = None
+    if weather:
+        day_weather = {
+            "condition": weather.get("main", "Unknown"),
+            "description": weather.get("description", ""),
+            "temperature": weather.get("temp", 20),
+            "feels_like": weather.get("feels_like"),
+            "humidity": weather.get("humidity"),
+        }
     
-    # Build days
+    # Build days, accumulating trip totals in the same pass
     days = []
+    total_places = 0
+    total_score = 0.0
     for day_data in solver_output:
         day_num = day_data["day"]
+        total_places += day_data["num_places"]
+        total_score += day_data["total_score"]
         
         # Calculate day's date
         day_date = None
-        if start_date:
-            try:
-                start = datetime.strptime(start_date, "%Y-%m-%d")
-                day_dt = start + timedelta(days=day_num - 1)
-                day_date = day_dt.strftime("%Y-%m-%d")
-            except:
-                day_date = None
+        if start:
+            day_date = (start + timedelta(days=day_num - 1)).isoformat()
         
         # Convert places to ItineraryPlace format
         places = []
         for item in day_data["items"]:
+            # Read each field once; several are used more than once below
+            get = item.get
+            category = get("category", "other")
+            why = get("why", "")
+            score = get("score", 0)
+            
             # Derive tags from Google Places types
-            tags = derive_tags(item.get("types", []), item.get("category", ""))
+            tags = derive_tags(get("types", []), category)
             
             # Generate low score note if utility score < 70
-            score = item.get("score", 0)
-            score_breakdown = item.get("score_breakdown")
             low_score_note = generate_low_score_note(
                 score=score,
-                score_breakdown=score_breakdown,
-                category=item.get("category", ""),
-                why=item.get("why", "")
+                score_breakdown=get("score_breakdown"),
+                category=category,
+                why=why
             )
             
             place = {
-                "id": item.get("place_id", ""),
-                "name": item.get("name", ""),
-                "category": item.get("category", "other"),
+                "id": get("place_id", ""),
+                "name": get("name", ""),
+                "category": category,
                 "coordinates": {
-                    "lat": item.get("lat", 0),
-                    "lng": item.get("lng", 0),
+                    "lat": get("lat", 0),
+                    "lng": get("lng", 0),
                 },
                 "time": {
-                    "arrival": item.get("arrival_time_formatted", ""),
-                    "departure": item.get("departure_time_formatted", ""),
-                    "duration_minutes": item.get("duration", 60),
+                    "arrival": get("arrival_time_formatted", ""),
+                    "departure": get("departure_time_formatted", ""),
+                    "duration_minutes": get("duration", 60),
                 },
                 "score": round(score, 1),
-                "why": item.get("why", ""),
-                "address": item.get("formatted_address"),
-                "photo_url": item.get("photo_url"),
-                "rating": item.get("rating"),
-                "review_count": item.get("review_count"),
+                "why": why,
+                "address": get("formatted_address"),
+                "photo_url": get("photo_url"),
+                "rating": get("rating"),
+                "review_count": get("review_count"),
                 "tags": tags,
                 "low_score_note": low_score_note,
             }
@@ -441,17 +454,6 @@ def format_itinerary_response(
             "end_time": places[-1]["time"]["departure"] if places else None,
         }
         
-        # Add weather info (same weather for all days currently - future: per-day forecast)
-        day_weather = None
-        if weather:
-            day_weather = {
-                "condition": weather.get("main", "Unknown"),
-                "description": weather.get("description", ""),
-                "temperature": weather.get("temp", 20),
-                "feels_like": weather.get("feels_like"),
-                "humidity": weather.get("humidity"),
-            }
-        
         days.append({
             "day_number": day_num,
             "date": day_date,
@@ -460,6 +462,20 @@ def format_itinerary_response(
             "summary": summary,
         })
     
+    places_dropped = len(original_places) - total_places
+    
+    # Build trip summary
+    trip = {
+        "city": city,
+        "num_days": num_days,
+        "start_date": start_date,
+        "end_date": end_date,
+        "total_places": total_places,
+        "total_score": round(total_score, 1),
+        "places_dropped": places_dropped,
+        "vibe": vibe,
+    }
+    
     # Build hotel
     hotel = None
     if hotel_coords:
@@ -474,6 +490,16 @@ def format_itinerary_response(
     }
 
 
+def serialize_itinerary_msgpack(data: Dict[str, Any]) -> bytes:
+    """
+    Serialize a formatted response dict to MessagePack.
+    
+    For backend service callers (Accept: application/msgpack) - the payload
+    is smaller and faster to decode than JSON. Browsers keep getting JSON.
+    """
+    return ormsgpack.packb(data)
+
+
 def format_error_response(error_message: str, city: str = "", vibe: str = "") -> Dict[str, Any]:
     """
     Create an error response in the standard format.
@@ -549,7 +575,7 @@ EXAMPLE_RESPONSE = {
 
 
 if __name__ == "__main__":
-    import json
+    import orjson
     print("EXAMPLE ITINERARY RESPONSE FORMAT:")
     print("="*60)
-    print(json.dumps(EXAMPLE_RESPONSE, indent=2))
+    print(orjson.dumps(EXAMPLE_RESPONSE, option=orjson.OPT_INDENT_2).decode())
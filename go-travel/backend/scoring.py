@@ -8,11 +8,45 @@ Author: go. travel planner
 """
 
 import math
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
+import numpy as np
 
-@dataclass
+
+# Earth's radius in kilometers (for Haversine formula)
+EARTH_RADIUS_KM: float = 6371.0
+
+# Decay constant for distance penalty
+# At 10km, multiplier ≈ 0.61 (39% penalty)
+# At 5km, multiplier ≈ 0.78 (22% penalty)
+# At 20km, multiplier ≈ 0.37 (63% penalty)
+DISTANCE_DECAY_RATE: float = 0.05
+
+# rank_places uses the equirectangular approximation for points within
+# this many degrees of latitude of the centroid (error < 0.3% at 20km),
+# and the exact haversine formula beyond it
+EQUIRECT_MAX_DELTA_DEG: float = 2.0
+
+# Minimum score threshold - places below this are filtered out
+MIN_SCORE_THRESHOLD: float = 40.0
+
+# Default number of places rank_places returns (None = no limit).
+# /generate asks Claude for at most 30 candidates.
+DEFAULT_TOP_K: Optional[int] = 50
+
+# Outdoor place types that are affected by weather
+OUTDOOR_TYPES: frozenset = frozenset({
+    "park", "zoo", "amusement_park", "campground", "stadium",
+    "natural_feature", "hiking_area", "beach", "garden",
+    "nature", "outdoor"  # Including our custom categories
+})
+
+# Weather conditions that penalize outdoor activities
+BAD_WEATHER_CONDITIONS: frozenset = frozenset({"Rain", "Drizzle", "Thunderstorm", "Snow"})
+
+
+@dataclass(slots=True)
 class CandidatePlace:
     """Represents a candidate place with all relevant attributes."""
     name: str
@@ -66,400 +100,573 @@ class CandidatePlace:
         }
 
 
-class UtilityScorer:
+def haversine_distance(
+    lat1: float, 
+    lng1: float, 
+    lat2: float, 
+    lng2: float
+) -> float:
     """
-    Calculates utility scores for candidate places using a weighted multi-factor model.
+    Calculate the great-circle distance between two points on Earth.
     
-    The scoring function combines:
-    1. Base quality score (from Google ratings)
-    2. Spatial decay (penalizes distant places)
-    3. Weather compatibility (penalizes outdoor places in bad weather)
-    4. Social proof boost (rewards highly-reviewed places)
+    Uses the Haversine formula, with sin²(x/2) written as (1 - cos(x)) / 2
+    so each term takes one cos instead of a sin and a square:
+    a = (1 - cos(Δlat)) / 2 + cos(lat1) * cos(lat2) * (1 - cos(Δlng)) / 2
+    c = 2 * asin(√a)
+    d = R * c
     
-    Final scores range from 0.0 to 100.0+
+    asin(√a) equals the textbook atan2(√a, √(1-a)) for a in [0, 1], with
+    one sqrt and one transcendental fewer; a is clamped to 1 against
+    rounding for near-antipodal points.
+    
+    Args:
+        lat1, lng1: Coordinates of point 1 (in degrees)
+        lat2, lng2: Coordinates of point 2 (in degrees)
+    
+    Returns:
+        Distance in kilometers
     """
+    # Convert degrees to radians
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lng = math.radians(lng2 - lng1)
     
-    # Earth's radius in kilometers (for Haversine formula)
-    EARTH_RADIUS_KM: float = 6371.0
+    # Haversine formula
+    # a = (1 - cos(Δlat)) / 2 + cos(lat1) * cos(lat2) * (1 - cos(Δlng)) / 2
+    a = 0.5 * (
+        (1 - math.cos(delta_lat)) +
+        math.cos(lat1_rad) * math.cos(lat2_rad) *
+        (1 - math.cos(delta_lng))
+    )
     
-    # Decay constant for distance penalty
-    # At 10km, multiplier ≈ 0.61 (39% penalty)
-    # At 5km, multiplier ≈ 0.78 (22% penalty)
-    # At 20km, multiplier ≈ 0.37 (63% penalty)
-    DISTANCE_DECAY_RATE: float = 0.05
+    # c = 2 * asin(√a)
+    c = 2 * math.asin(math.sqrt(min(a, 1.0)))
     
-    # Minimum score threshold - places below this are filtered out
-    MIN_SCORE_THRESHOLD: float = 40.0
+    # d = R * c
+    distance_km = EARTH_RADIUS_KM * c
     
-    # Outdoor place types that are affected by weather
-    OUTDOOR_TYPES: set = {
-        "park", "zoo", "amusement_park", "campground", "stadium",
-        "natural_feature", "hiking_area", "beach", "garden",
-        "nature", "outdoor"  # Including our custom categories
-    }
+    return distance_km
+
+
+def haversine_distances(
+    lats: np.ndarray,
+    lngs: np.ndarray,
+    lat0: float,
+    lng0: float
+) -> np.ndarray:
+    """
+    Vectorized haversine_distance from many points to a single point.
     
-    # Weather conditions that penalize outdoor activities
-    BAD_WEATHER_CONDITIONS: set = {"Rain", "Drizzle", "Thunderstorm", "Snow"}
-    
-    def __init__(self):
-        """Initialize the UtilityScorer with default parameters."""
-        pass
-    
-    def haversine_distance(
-        self, 
-        lat1: float, 
-        lng1: float, 
-        lat2: float, 
-        lng2: float
-    ) -> float:
-        """
-        Calculate the great-circle distance between two points on Earth.
-        
-        Uses the Haversine formula:
-        a = sin²(Δlat/2) + cos(lat1) * cos(lat2) * sin²(Δlng/2)
-        c = 2 * atan2(√a, √(1-a))
-        d = R * c
-        
-        Args:
-            lat1, lng1: Coordinates of point 1 (in degrees)
-            lat2, lng2: Coordinates of point 2 (in degrees)
-        
-        Returns:
-            Distance in kilometers
-        """
-        # Convert degrees to radians
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lng = math.radians(lng2 - lng1)
-        
-        # Haversine formula
-        # a = sin²(Δlat/2) + cos(lat1) * cos(lat2) * sin²(Δlng/2)
-        a = (
-            math.sin(delta_lat / 2) ** 2 +
-            math.cos(lat1_rad) * math.cos(lat2_rad) * 
-            math.sin(delta_lng / 2) ** 2
-        )
-        
-        # c = 2 * atan2(√a, √(1-a))
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        
-        # d = R * c
-        distance_km = self.EARTH_RADIUS_KM * c
-        
-        return distance_km
-    
-    def calculate_base_score(self, rating: Optional[float]) -> float:
-        """
-        Calculate base score from Google rating.
-        
-        Normalizes the 0-5 star rating to a 0-100 scale.
-        Formula: score = rating * 20
-        
-        Args:
-            rating: Google Places rating (0.0 to 5.0)
-        
-        Returns:
-            Base score (0.0 to 100.0)
-        """
-        if rating is None:
-            # Default to average rating if unknown
-            return 60.0  # Equivalent to 3.0 stars
-        
-        # Clamp rating to valid range
-        rating = max(0.0, min(5.0, rating))
-        
-        return rating * 20.0
-    
-    def calculate_distance_multiplier(
-        self, 
-        place_lat: Optional[float], 
-        place_lng: Optional[float],
-        centroid_lat: float,
-        centroid_lng: float
-    ) -> float:
-        """
-        Calculate spatial decay multiplier based on distance from centroid.
-        
-        Uses exponential decay: multiplier = e^(-k * distance)
-        where k = 0.15 (decay rate constant)
-        
-        Effect at various distances:
-        - 0 km:  multiplier = 1.00 (no penalty)
-        - 2 km:  multiplier = 0.74 (26% penalty)
-        - 5 km:  multiplier = 0.47 (53% penalty)
-        - 10 km: multiplier = 0.22 (78% penalty)
-        - 20 km: multiplier = 0.05 (95% penalty)
-        
-        Args:
-            place_lat, place_lng: Coordinates of the place
-            centroid_lat, centroid_lng: Coordinates of trip centroid
-        
-        Returns:
-            Multiplier between 0.0 and 1.0
-        """
-        if place_lat is None or place_lng is None:
-            # No coordinates - apply moderate penalty
-            return 0.5
-        
-        distance_km = self.haversine_distance(
-            place_lat, place_lng,
-            centroid_lat, centroid_lng
-        )
-        
-        # Exponential decay: e^(-k * d)
-        # This creates a smooth falloff where nearby places are preferred
-        multiplier = math.exp(-self.DISTANCE_DECAY_RATE * distance_km)
-        
-        return multiplier
-    
-    def calculate_weather_multiplier(
-        self,
-        place_types: List[str],
-        place_category: str,
-        weather: Optional[Dict[str, Any]]
-    ) -> float:
-        """
-        Calculate weather compatibility multiplier.
-        
-        Penalizes outdoor places during inclement weather:
-        - Rain/Drizzle + outdoor: 0.3 multiplier (70% penalty)
-        - Cold (<5°C) + outdoor: 0.5 multiplier (50% penalty)
-        - Good weather or indoor: 1.0 multiplier (no penalty)
-        
-        Args:
-            place_types: List of Google place types
-            place_category: Our custom category (nature, landmark, etc.)
-            weather: Dict with 'main' (condition) and 'temp' (celsius)
-        
-        Returns:
-            Multiplier between 0.3 and 1.0
-        """
-        if weather is None:
-            # No weather data - no penalty
-            return 1.0
-        
-        # Check if place is outdoor
-        is_outdoor = any(
-            t.lower() in self.OUTDOOR_TYPES 
-            for t in place_types + [place_category]
-        )
-        
-        if not is_outdoor:
-            # Indoor place - no weather penalty
-            return 1.0
-        
-        # Get weather conditions
-        main_condition = weather.get("main", "").strip()
-        temp_celsius = weather.get("temp", 20.0)  # Default to comfortable temp
-        
-        multiplier = 1.0
-        
-        # Heavy penalty for rain/drizzle on outdoor activities
-        if main_condition in self.BAD_WEATHER_CONDITIONS:
-            multiplier *= 0.3
-        
-        # Moderate penalty for cold weather on outdoor activities
-        if temp_celsius < 5.0:
-            multiplier *= 0.5
-        
-        return multiplier
-    
-    def calculate_social_proof_bonus(
-        self, 
-        user_ratings_total: Optional[int]
-    ) -> float:
-        """
-        Calculate social proof bonus based on review count.
-        
-        Places with many reviews are more reliable indicators of quality.
-        A 4.9 with 5 reviews is less trustworthy than 4.7 with 5000 reviews.
-        
-        Bayesian approximation bonus:
-        - < 100 reviews:   +0 points
-        - 100-999 reviews: +5 points
-        - 1000+ reviews:   +10 points
-        
-        Args:
-            user_ratings_total: Number of Google reviews
-        
-        Returns:
-            Bonus points (0, 5, or 10)
-        """
-        if user_ratings_total is None:
-            return 0.0
-        
-        if user_ratings_total >= 1000:
-            # Highly reviewed - very trustworthy
-            return 10.0
-        elif user_ratings_total >= 100:
-            # Moderately reviewed - somewhat trustworthy
-            return 5.0
-        else:
-            # Few reviews - no bonus
-            return 0.0
-    
-    def calculate_score(
-        self,
-        place: CandidatePlace,
-        weather: Optional[Dict[str, Any]],
-        centroid_lat: float,
-        centroid_lng: float
-    ) -> float:
-        """
-        Calculate the final utility score for a single place.
-        
-        Formula:
-        score = (base_score * distance_mult * weather_mult) + social_bonus
-        
-        Where:
-        - base_score = rating * 20 (0-100)
-        - distance_mult = e^(-0.15 * km) (0-1)
-        - weather_mult = 0.3 to 1.0 based on conditions
-        - social_bonus = 0, 5, or 10 based on review count
-        
-        Args:
-            place: CandidatePlace object
-            weather: Weather data dict
-            centroid_lat, centroid_lng: Trip centroid coordinates
-        
-        Returns:
-            Final utility score (0.0 to ~110.0)
-        """
-        # 1. Base Score from rating
-        base_score = self.calculate_base_score(place.rating)
-        
-        # 2. Gravity Factor (distance decay)
-        distance_mult = self.calculate_distance_multiplier(
-            place.lat, place.lng,
-            centroid_lat, centroid_lng
-        )
-        
-        # Calculate actual distance for breakdown
-        distance_km = 0.0
-        if place.lat is not None and place.lng is not None:
-            distance_km = self.haversine_distance(
-                place.lat, place.lng, centroid_lat, centroid_lng
-            )
-        
-        # 3. Reality Factor (weather penalty)
-        weather_mult = self.calculate_weather_multiplier(
-            place.types, place.category, weather
-        )
-        
-        # Check if place is outdoor (for breakdown)
-        is_outdoor = any(
-            t.lower() in self.OUTDOOR_TYPES 
-            for t in place.types + [place.category]
+    cos(lat0) is a scalar computed once for the whole batch.
+    
+    Args:
+        lats, lngs: Arrays of coordinates (in degrees)
+        lat0, lng0: Coordinates of the reference point (in degrees)
+    
+    Returns:
+        Array of distances in kilometers
+    """
+    delta_lat = np.radians(lat0 - lats)
+    delta_lng = np.radians(lng0 - lngs)
+    
+    a = 0.5 * (
+        (1 - np.cos(delta_lat)) +
+        np.cos(np.radians(lats)) * math.cos(math.radians(lat0)) *
+        (1 - np.cos(delta_lng))
+    )
+    c = 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    
+    return EARTH_RADIUS_KM * c
+
+
+def approx_distances(
+    lats: np.ndarray,
+    lngs: np.ndarray,
+    lat0: float,
+    lng0: float
+) -> np.ndarray:
+    """
+    Fast distances from many points to a single point.
+    
+    Uses the equirectangular projection, with cos(lat0) computed once:
+    d = R * √(Δlat² + (cos(lat0) * Δlng)²)
+    
+    Points more than EQUIRECT_MAX_DELTA_DEG of latitude away fall back
+    to haversine_distances, where the approximation stops being accurate.
+    
+    Args:
+        lats, lngs: Arrays of coordinates (in degrees)
+        lat0, lng0: Coordinates of the reference point (in degrees)
+    
+    Returns:
+        Array of distances in kilometers
+    """
+    delta_lat = np.radians(lats - lat0)
+    delta_lng = np.radians(lngs - lng0) * math.cos(math.radians(lat0))
+    distances = EARTH_RADIUS_KM * np.sqrt(delta_lat * delta_lat + delta_lng * delta_lng)
+    
+    far = np.abs(lats - lat0) > EQUIRECT_MAX_DELTA_DEG
+    if far.any():
+        distances[far] = haversine_distances(lats[far], lngs[far], lat0, lng0)
+    
+    return distances
+
+
+def calculate_base_score(rating: Optional[float]) -> float:
+    """
+    Calculate base score from Google rating.
+    
+    Normalizes the 0-5 star rating to a 0-100 scale.
+    Formula: score = rating * 20
+    
+    Args:
+        rating: Google Places rating (0.0 to 5.0)
+    
+    Returns:
+        Base score (0.0 to 100.0)
+    """
+    if rating is None:
+        # Default to average rating if unknown
+        return 60.0  # Equivalent to 3.0 stars
+    
+    # Clamp rating to valid range
+    rating = max(0.0, min(5.0, rating))
+    
+    return rating * 20.0
+
+
+def calculate_distance_multiplier(
+    place_lat: Optional[float], 
+    place_lng: Optional[float],
+    centroid_lat: float,
+    centroid_lng: float
+) -> float:
+    """
+    Calculate spatial decay multiplier based on distance from centroid.
+    
+    Uses exponential decay: multiplier = e^(-k * distance)
+    where k = 0.15 (decay rate constant)
+    
+    Effect at various distances:
+    - 0 km:  multiplier = 1.00 (no penalty)
+    - 2 km:  multiplier = 0.74 (26% penalty)
+    - 5 km:  multiplier = 0.47 (53% penalty)
+    - 10 km: multiplier = 0.22 (78% penalty)
+    - 20 km: multiplier = 0.05 (95% penalty)
+    
+    Args:
+        place_lat, place_lng: Coordinates of the place
+        centroid_lat, centroid_lng: Coordinates of trip centroid
+    
+    Returns:
+        Multiplier between 0.0 and 1.0
+    """
+    if place_lat is None or place_lng is None:
+        # No coordinates - apply moderate penalty
+        return 0.5
+    
+    distance_km = haversine_distance(
+        place_lat, place_lng,
+        centroid_lat, centroid_lng
+    )
+    
+    # Exponential decay: e^(-k * d)
+    # This creates a smooth falloff where nearby places are preferred
+    multiplier = math.exp(-DISTANCE_DECAY_RATE * distance_km)
+    
+    return multiplier
+
+
+def is_outdoor_place(place_types: Optional[List[str]], place_category: str) -> bool:
+    """
+    Check whether a place is outdoor (and so affected by weather).
+    
+    The category is checked first - it's a single string and usually
+    decides it - then the Google types, stopping at the first match.
+    
+    Args:
+        place_types: List of Google place types
+        place_category: Our custom category (nature, landmark, etc.)
+    
+    Returns:
+        True if the category or any type is an outdoor type
+    """
+    outdoor_types = OUTDOOR_TYPES
+    if place_category and place_category.lower() in outdoor_types:
+        return True
+    for place_type in place_types or ():
+        if place_type.lower() in outdoor_types:
+            return True
+    return False
+
+
+def calculate_weather_multiplier(
+    place_types: List[str],
+    place_category: str,
+    weather: Optional[Dict[str, Any]]
+) -> float:
+    """
+    Calculate weather compatibility multiplier.
+    
+    Penalizes outdoor places during inclement weather:
+    - Rain/Drizzle + outdoor: 0.3 multiplier (70% penalty)
+    - Cold (<5°C) + outdoor: 0.5 multiplier (50% penalty)
+    - Good weather or indoor: 1.0 multiplier (no penalty)
+    
+    Args:
+        place_types: List of Google place types
+        place_category: Our custom category (nature, landmark, etc.)
+        weather: Dict with 'main' (condition) and 'temp' (celsius)
+    
+    Returns:
+        Multiplier between 0.3 and 1.0
+    """
+    if weather is None:
+        # No weather data - no penalty
+        return 1.0
+    
+    if not is_outdoor_place(place_types, place_category):
+        # Indoor place - no weather penalty
+        return 1.0
+    
+    return outdoor_weather_multiplier(weather)
+
+
+def outdoor_weather_multiplier(weather: Dict[str, Any]) -> float:
+    """
+    Weather multiplier for an outdoor place (indoor places always get 1.0).
+    
+    Depends only on the weather, so rank_places computes it once per call.
+    
+    Args:
+        weather: Dict with 'main' (condition) and 'temp' (celsius)
+    
+    Returns:
+        Multiplier between 0.15 and 1.0
+    """
+    # Get weather conditions
+    main_condition = weather.get("main", "").strip()
+    temp_celsius = weather.get("temp", 20.0)  # Default to comfortable temp
+    
+    multiplier = 1.0
+    
+    # Heavy penalty for rain/drizzle on outdoor activities
+    if main_condition in BAD_WEATHER_CONDITIONS:
+        multiplier *= 0.3
+    
+    # Moderate penalty for cold weather on outdoor activities
+    if temp_celsius < 5.0:
+        multiplier *= 0.5
+    
+    return multiplier
+
+
+def calculate_social_proof_bonus(
+    user_ratings_total: Optional[int]
+) -> float:
+    """
+    Calculate social proof bonus based on review count.
+    
+    Places with many reviews are more reliable indicators of quality.
+    A 4.9 with 5 reviews is less trustworthy than 4.7 with 5000 reviews.
+    
+    Bayesian approximation bonus:
+    - < 100 reviews:   +0 points
+    - 100-999 reviews: +5 points
+    - 1000+ reviews:   +10 points
+    
+    Args:
+        user_ratings_total: Number of Google reviews
+    
+    Returns:
+        Bonus points (0, 5, or 10)
+    """
+    review_count = user_ratings_total or 0
+    
+    # +5 for being moderately reviewed (100+), another +5 for being
+    # highly reviewed (1000+) - comparisons as 0/1, no branches
+    return 5.0 * (review_count >= 100) + 5.0 * (review_count >= 1000)
+
+
+def calculate_score(
+    place: CandidatePlace,
+    weather: Optional[Dict[str, Any]],
+    centroid_lat: float,
+    centroid_lng: float
+) -> float:
+    """
+    Calculate the final utility score for a single place.
+    
+    Formula:
+    score = (base_score * distance_mult * weather_mult) + social_bonus
+    
+    Where:
+    - base_score = rating * 20 (0-100)
+    - distance_mult = e^(-0.15 * km) (0-1)
+    - weather_mult = 0.3 to 1.0 based on conditions
+    - social_bonus = 0, 5, or 10 based on review count
+    
+    Args:
+        place: CandidatePlace object
+        weather: Weather data dict
+        centroid_lat, centroid_lng: Trip centroid coordinates
+    
+    Returns:
+        Final utility score (0.0 to ~110.0)
+    """
+    # 1. Base Score from rating
+    base_score = calculate_base_score(place.rating)
+    
+    # 2. Gravity Factor (distance decay) - same as calculate_distance_multiplier,
+    # but the distance is computed once and reused for the breakdown
+    distance_km = 0.0
+    if place.lat is not None and place.lng is not None:
+        distance_km = haversine_distance(
+            place.lat, place.lng, centroid_lat, centroid_lng
         )
-        
-        # 4. Social Proof Boost
-        social_bonus = self.calculate_social_proof_bonus(place.user_ratings_total)
-        
-        # Final score calculation
-        # Multiplicative factors apply to base, then add bonus
-        final_score = (base_score * distance_mult * weather_mult) + social_bonus
-        
-        # Store breakdown for explanation
-        place.score_breakdown = {
-            "base_score": round(base_score, 1),
-            "distance_km": round(distance_km, 1),
-            "distance_multiplier": round(distance_mult, 2),
-            "weather_multiplier": round(weather_mult, 2),
-            "social_bonus": social_bonus,
-            "is_outdoor": is_outdoor,
-            "weather_condition": weather.get("main") if weather else None,
-            "temperature": weather.get("temp") if weather else None,
-        }
-        
-        return final_score
-    
-    def rank_places(
-        self,
-        places: List[Dict[str, Any]],
-        weather: Optional[Dict[str, Any]] = None,
-        centroid: Optional[Dict[str, float]] = None
-    ) -> List[Dict[str, Any]]:
-        """
-        Rank and filter places by utility score.
-        
-        Process:
-        1. Convert dicts to CandidatePlace objects
-        2. Calculate centroid if not provided (average of all coordinates)
-        3. Score each place
-        4. Filter out places with score < 40.0
-        5. Sort by score descending
-        6. Return as list of dicts
-        
-        Args:
-            places: List of place dictionaries from Google Places API
-            weather: Optional weather data {'main': str, 'temp': float}
-            centroid: Optional centroid {'lat': float, 'lng': float}
-        
-        Returns:
-            Filtered and sorted list of place dicts with 'score' field added
-        """
-        if not places:
-            return []
-        
-        # Convert to CandidatePlace objects
-        candidates = [CandidatePlace.from_dict(p) for p in places]
-        
-        # Calculate centroid if not provided (average of all valid coordinates)
-        if centroid is None:
-            valid_coords = [
-                (c.lat, c.lng) for c in candidates 
-                if c.lat is not None and c.lng is not None
-            ]
-            if valid_coords:
-                centroid_lat = sum(lat for lat, _ in valid_coords) / len(valid_coords)
-                centroid_lng = sum(lng for _, lng in valid_coords) / len(valid_coords)
-            else:
-                # Fallback to first place with coords or 0,0
-                centroid_lat, centroid_lng = 0.0, 0.0
-        else:
-            centroid_lat = centroid.get("lat", 0.0)
-            centroid_lng = centroid.get("lng", 0.0)
-        
-        # Calculate scores for all candidates
-        for candidate in candidates:
-            candidate.score = self.calculate_score(
-                candidate, weather, centroid_lat, centroid_lng
-            )
-        
-        # Filter out low-scoring places
-        qualified = [c for c in candidates if c.score >= self.MIN_SCORE_THRESHOLD]
-        
-        # Sort by score descending
-        qualified.sort(key=lambda c: c.score, reverse=True)
-        
-        # Convert back to dicts
-        return [c.to_dict() for c in qualified]
+        distance_mult = math.exp(-DISTANCE_DECAY_RATE * distance_km)
+    else:
+        # No coordinates - apply moderate penalty
+        distance_mult = 0.5
+    
+    # 3. Reality Factor (weather penalty)
+    weather_mult = calculate_weather_multiplier(
+        place.types, place.category, weather
+    )
+    
+    # Check if place is outdoor (for breakdown)
+    is_outdoor = is_outdoor_place(place.types, place.category)
+    
+    # 4. Social Proof Boost
+    social_bonus = calculate_social_proof_bonus(place.user_ratings_total)
+    
+    # Final score calculation
+    # Multiplicative factors apply to base, then add bonus
+    final_score = (base_score * distance_mult * weather_mult) + social_bonus
+    
+    # Store breakdown for explanation
+    place.score_breakdown = {
+        "base_score": round(base_score, 1),
+        "distance_km": round(distance_km, 1),
+        "distance_multiplier": round(distance_mult, 2),
+        "weather_multiplier": round(weather_mult, 2),
+        "social_bonus": social_bonus,
+        "is_outdoor": is_outdoor,
+        "weather_condition": weather.get("main") if weather else None,
+        "temperature": weather.get("temp") if weather else None,
+    }
+    
+    return final_score
 
 
 def rank_places(
     places: List[Dict[str, Any]],
     weather: Optional[Dict[str, Any]] = None,
-    centroid: Optional[Dict[str, float]] = None
+    centroid: Optional[Dict[str, float]] = None,
+    top_k: Optional[int] = DEFAULT_TOP_K
 ) -> List[Dict[str, Any]]:
     """
-    Convenience function to rank places without instantiating UtilityScorer.
+    Rank and filter places by utility score.
+    
+    Process:
+    1. Read the fields each place dict needs into NumPy arrays
+    2. Calculate centroid if not provided (average of all coordinates)
+    3. Score every place in one vectorized pass
+    4. Filter out places with score < 40.0
+    5. Keep the top_k best (partial selection), sorted by score descending
+    6. Return the kept places' fields (see _ranked_fields) with 'score' and
+       'score_breakdown' added
     
     Args:
-        places: List of place dictionaries
+        places: List of place dictionaries from Google Places API
         weather: Optional weather data {'main': str, 'temp': float}
         centroid: Optional centroid {'lat': float, 'lng': float}
+        top_k: Maximum number of places to return (None for all)
     
     Returns:
-        Filtered and sorted list of place dicts with scores
+        Filtered and sorted list of place dicts with 'score' field added
+    """
+    if not places:
+        return []
+    
+    rows = _score_rows(places, weather, centroid, top_k)
+    
+    # Build output dicts, with breakdowns for explanation, for the kept
+    # places only. Input dicts are not mutated.
+    weather_condition = weather.get("main") if weather else None
+    temperature = weather.get("temp") if weather else None
+    return [
+        {
+            **_ranked_fields(places[i]),
+            "score": score,
+            "score_breakdown": {
+                "base_score": base,
+                "distance_km": dist,
+                "distance_multiplier": dist_mult,
+                "weather_multiplier": wx_mult,
+                "social_bonus": bonus,
+                "is_outdoor": outdoor,
+                "weather_condition": weather_condition,
+                "temperature": temperature,
+            },
+        }
+        for i, score, base, dist, dist_mult, wx_mult, bonus, outdoor in rows
+    ]
+
+
+def _ranked_fields(place: Dict[str, Any]) -> Dict[str, Any]:
     """
-    scorer = UtilityScorer()
-    return scorer.rank_places(places, weather, centroid)
+    Copy the fields a ranked place carries downstream - the same set, with
+    the same defaults, as CandidatePlace.from_dict/to_dict. Other enriched
+    fields (e.g. opening_hours) are deliberately not passed to the solver.
+    """
+    get = place.get
+    return {
+        "name": get("name", ""),
+        "lat": get("lat"),
+        "lng": get("lng"),
+        "types": get("types", []),
+        "rating": get("rating"),
+        "user_ratings_total": get("user_ratings_total"),
+        "category": get("category", ""),
+        "why": get("why", ""),
+        "place_id": get("place_id"),
+        "formatted_address": get("formatted_address"),
+        "photo_url": get("photo_url"),
+    }
+
+
+def _score_rows(
+    places: List[Dict[str, Any]],
+    weather: Optional[Dict[str, Any]],
+    centroid: Optional[Dict[str, float]],
+    top_k: Optional[int]
+) -> List[Tuple]:
+    """
+    Score places in one vectorized pass and return the kept ones in rank order.
+    
+    Returns:
+        Rows of (index, score, base_score, distance_km, distance_multiplier,
+        weather_multiplier, social_bonus, is_outdoor) as Python scalars,
+        rounded as they appear in the output
+    """
+    n = len(places)
+    
+    # Structure-of-arrays view of the places; missing values become NaN
+    lats = np.fromiter(
+        (np.nan if (v := p.get("lat")) is None else v for p in places), dtype=np.float64, count=n
+    )
+    lngs = np.fromiter(
+        (np.nan if (v := p.get("lng")) is None else v for p in places), dtype=np.float64, count=n
+    )
+    ratings = np.fromiter(
+        (np.nan if (v := p.get("rating")) is None else v for p in places), dtype=np.float64, count=n
+    )
+    review_counts = np.fromiter(
+        (p.get("user_ratings_total") or 0 for p in places), dtype=np.float64, count=n
+    )
+    is_outdoor = np.fromiter(
+        (is_outdoor_place(p.get("types"), p.get("category", "")) for p in places),
+        dtype=bool,
+        count=n,
+    )
+    has_coords = ~(np.isnan(lats) | np.isnan(lngs))
+    
+    # Calculate centroid if not provided (average of all valid coordinates)
+    if centroid is None:
+        if has_coords.any():
+            centroid_lat = float(lats[has_coords].mean())
+            centroid_lng = float(lngs[has_coords].mean())
+        else:
+            # Fallback to first place with coords or 0,0
+            centroid_lat, centroid_lng = 0.0, 0.0
+    else:
+        centroid_lat = centroid.get("lat", 0.0)
+        centroid_lng = centroid.get("lng", 0.0)
+    
+    # Score all places at once - same formula as calculate_score
+    base_scores = np.where(np.isnan(ratings), 60.0, np.clip(ratings, 0.0, 5.0) * 20.0)
+    social_bonuses = 5.0 * (review_counts >= 100) + 5.0 * (review_counts >= 1000)
+    
+    # Both multipliers are <= 1, so base + bonus bounds the score. Places
+    # that can't reach the threshold even then skip the distance math;
+    # their distance stays 0 and they are filtered out below regardless.
+    needs_distance = has_coords & (base_scores + social_bonuses >= MIN_SCORE_THRESHOLD)
+    distances_km = np.zeros(n)
+    distances_km[needs_distance] = approx_distances(
+        lats[needs_distance], lngs[needs_distance], centroid_lat, centroid_lng
+    )
+    distance_mults = np.where(
+        has_coords, np.exp(-DISTANCE_DECAY_RATE * distances_km), 0.5
+    )
+    if weather is None:
+        weather_mults = np.ones(n)
+    else:
+        weather_mults = np.where(is_outdoor, outdoor_weather_multiplier(weather), 1.0)
+    scores = base_scores * distance_mults * weather_mults + social_bonuses
+    
+    # Filter out low-scoring places. If more than top_k remain, select the
+    # best top_k with argpartition (O(N)) so only those get sorted.
+    keep = np.flatnonzero(scores >= MIN_SCORE_THRESHOLD)
+    if top_k is not None and len(keep) > top_k:
+        keep = np.sort(keep[np.argpartition(-scores[keep], top_k - 1)[:top_k]])
+    # Sort by score descending (stable, so ties keep their input order)
+    order = keep[np.argsort(-scores[keep], kind="stable")]
+    
+    # Round the kept values in bulk rather than per output dict
+    return list(zip(
+        order.tolist(),
+        np.round(scores[order], 2).tolist(),
+        np.round(base_scores[order], 1).tolist(),
+        np.round(distances_km[order], 1).tolist(),
+        np.round(distance_mults[order], 2).tolist(),
+        np.round(weather_mults[order], 2).tolist(),
+        social_bonuses[order].tolist(),
+        is_outdoor[order].tolist(),
+    ))
+
+
+class UtilityScorer:
+    """
+    Calculates utility scores for candidate places using a weighted multi-factor model.
+    
+    The scoring function combines:
+    1. Base quality score (from Google ratings)
+    2. Spatial decay (penalizes distant places)
+    3. Weather compatibility (penalizes outdoor places in bad weather)
+    4. Social proof boost (rewards highly-reviewed places)
+    
+    Final scores range from 0.0 to 100.0+
+    
+    Kept for API compatibility: the scoring logic lives in the module-level
+    functions above, which this class exposes as static methods.
+    """
+    
+    EARTH_RADIUS_KM = EARTH_RADIUS_KM
+    DISTANCE_DECAY_RATE = DISTANCE_DECAY_RATE
+    EQUIRECT_MAX_DELTA_DEG = EQUIRECT_MAX_DELTA_DEG
+    MIN_SCORE_THRESHOLD = MIN_SCORE_THRESHOLD
+    DEFAULT_TOP_K = DEFAULT_TOP_K
+    OUTDOOR_TYPES = OUTDOOR_TYPES
+    BAD_WEATHER_CONDITIONS = BAD_WEATHER_CONDITIONS
+    
+    haversine_distance = staticmethod(haversine_distance)
+    haversine_distances = staticmethod(haversine_distances)
+    approx_distances = staticmethod(approx_distances)
+    calculate_base_score = staticmethod(calculate_base_score)
+    calculate_distance_multiplier = staticmethod(calculate_distance_multiplier)
+    is_outdoor = staticmethod(is_outdoor_place)
+    calculate_weather_multiplier = staticmethod(calculate_weather_multiplier)
+    outdoor_weather_multiplier = staticmethod(outdoor_weather_multiplier)
+    calculate_social_proof_bonus = staticmethod(calculate_social_proof_bonus)
+    calculate_score = staticmethod(calculate_score)
+    rank_places = staticmethod(rank_places)
 
 
 # For testing
 if __name__ == "__main__":
-    import json
+    import orjson
     
     # Sample places (simulating Google Places data)
     test_places = [
@@ -509,10 +716,10 @@ if __name__ == "__main__":
     print("=== Test 1: Good Weather ===")
     weather_good = {"main": "Clear", "temp": 20.0}
     results = rank_places(test_places, weather_good)
-    print(json.dumps(results, indent=2))
+    print(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode())
     
     # Test 2: Rainy weather (should penalize Stanley Park)
     print("\n=== Test 2: Rainy Weather ===")
     weather_rain = {"main": "Rain", "temp": 10.0}
     results = rank_places(test_places, weather_rain)
-    print(json.dumps(results, indent=2))
+    print(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode())
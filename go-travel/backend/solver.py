@@ -16,11 +16,28 @@ Author: go. travel planner
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
+from functools import lru_cache
 import math
 
+import numpy as np
+import orjson
 
-@dataclass
+
+def _compute_hhmm(minutes: int) -> str:
+    """Format minutes from midnight as 12-hour H:MM AM/PM."""
+    hours, mins = divmod(minutes, 60)
+    return f"{hours % 12 or 12}:{mins:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+# Formatted times for every minute of a day, built once at import
+MINUTES_PER_DAY = 24 * 60
+_MINUTE_TO_HHMM: Tuple[str, ...] = tuple(_compute_hhmm(m) for m in range(MINUTES_PER_DAY))
+
+
+@dataclass(slots=True)
 class ItineraryItem:
     """Represents a single stop in the itinerary."""
     place_id: str
@@ -63,16 +80,12 @@ class ItineraryItem:
     @staticmethod
     def _format_time(minutes: int) -> str:
         """Convert minutes from midnight to HH:MM format."""
-        hours = minutes // 60
-        mins = minutes % 60
-        period = "AM" if hours < 12 else "PM"
-        display_hour = hours % 12
-        if display_hour == 0:
-            display_hour = 12
-        return f"{display_hour}:{mins:02d} {period}"
+        if 0 <= minutes < MINUTES_PER_DAY:
+            return _MINUTE_TO_HHMM[minutes]
+        return _compute_hhmm(minutes)
 
 
-@dataclass
+@dataclass(slots=True)
 class DayItinerary:
     """Represents one day's complete itinerary."""
     day_number: int
@@ -91,6 +104,38 @@ class DayItinerary:
             "total_score": round(self.total_score, 2),
             "num_places": len(self.items),
         }
+    
+    def to_json_bytes(self) -> bytes:
+        """Serialize to_dict() straight to JSON bytes with orjson."""
+        return orjson.dumps(self.to_dict())
+
+
+# (first solution strategy, metaheuristic) pairs tried by solve_parallel,
+# in priority order - the first is the ItinerarySolver default
+PARALLEL_STRATEGIES: List[Tuple[int, int]] = [
+    (
+        routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION,
+        routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH,
+    ),
+    (
+        routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC,
+        routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH,
+    ),
+    (
+        routing_enums_pb2.FirstSolutionStrategy.SAVINGS,
+        routing_enums_pb2.LocalSearchMetaheuristic.TABU_SEARCH,
+    ),
+    (
+        routing_enums_pb2.FirstSolutionStrategy.CHRISTOFIDES,
+        routing_enums_pb2.LocalSearchMetaheuristic.SIMULATED_ANNEALING,
+    ),
+]
+
+
+# Routes of recent solves, keyed by the routing model inputs (see
+# ItinerarySolver._solve_cache_key); least recently used entries are evicted
+SOLVE_CACHE_MAX_ENTRIES = 64
+_solve_cache: "OrderedDict[tuple, Tuple[int, List[List[Tuple[int, int]]]]]" = OrderedDict()
 
 
 class ItinerarySolver:
@@ -107,10 +152,23 @@ class ItinerarySolver:
     # Constants
     EARTH_RADIUS_KM: float = 6371.0
     AVERAGE_SPEED_KMH: float = 12.0  # Realistic transit speed (includes waiting, walking to/from stops)
+    # Locations spanning up to this many km use the equirectangular distance
+    EQUIRECT_MAX_SPAN_KM: float = 200.0
     DAY_START_TIME: int = 540  # 9:00 AM in minutes from midnight
     DAY_END_TIME: int = 1320  # 10:00 PM in minutes from midnight
     MAX_DAY_DURATION: int = 780  # 13 hours in minutes (9 AM - 10 PM)
     DEFAULT_VISIT_DURATION: int = 60  # 1 hour default visit time
+    MAX_WAIT_TIME: int = 120  # Max slack at a stop while waiting for its time window
+    # Stop the local search after this many solutions - itineraries converge
+    # long before the time limit, which remains as a hard cap
+    SOLUTION_LIMIT: int = 200
+    # The time limit is scaled down to 1 second per this many places (at
+    # least 1 second), so small trips can't spend the full budget
+    PLACES_PER_SECOND: int = 5
+    # Score -> integer prize/penalty. The penalty is weighed against the time
+    # cost in minutes, so this sets how many minutes one score point is worth
+    # and is a modelling choice, not just precision.
+    PRIZE_SCALE: int = 10
     
     # Visit durations by category (in minutes)
     VISIT_DURATIONS: Dict[str, int] = {
@@ -156,9 +214,29 @@ class ItinerarySolver:
         "bar": (1080, 1380),           # 6:00 PM - 11:00 PM
     }
     
-    def __init__(self):
-        """Initialize the solver."""
-        pass
+    def __init__(
+        self,
+        first_solution_strategy: int = routing_enums_pb2.FirstSolutionStrategy.PARALLEL_CHEAPEST_INSERTION,
+        local_search_metaheuristic: int = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH,
+        fast_mode: bool = False
+    ):
+        """
+        Initialize the solver.
+        
+        Args:
+            first_solution_strategy: OR-Tools FirstSolutionStrategy used to build
+                the initial routes. Parallel cheapest insertion handles the time
+                windows and droppable places better than PATH_CHEAPEST_ARC.
+            local_search_metaheuristic: OR-Tools LocalSearchMetaheuristic used
+                to improve the initial routes
+            fast_mode: When no hotel is given, treat travel to and from the
+                synthetic centroid depot as free instead of computing it. Days
+                then under-count the trip out and back, so this trades
+                accuracy for speed.
+        """
+        self.first_solution_strategy = first_solution_strategy
+        self.local_search_metaheuristic = local_search_metaheuristic
+        self.fast_mode = fast_mode
     
     def haversine_distance(
         self, 
@@ -182,7 +260,8 @@ class ItinerarySolver:
             math.cos(lat1_rad) * math.cos(lat2_rad) *
             math.sin(delta_lng / 2) ** 2
         )
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        # asin form of atan2(√a, √(1-a)), valid for a in [0, 1]
+        c = 2 * math.asin(math.sqrt(min(a, 1.0)))
         
         return self.EARTH_RADIUS_KM * c
     
@@ -208,9 +287,105 @@ class ItinerarySolver:
         
         return travel_minutes + buffer
     
+    def calculate_travel_time_matrix(
+        self,
+        locations: List[Tuple[float, float]]
+    ) -> List[List[int]]:
+        """
+        Calculate travel times in minutes between all pairs of locations.
+        
+        Args:
+            locations: List of (lat, lng) tuples
+        
+        Returns:
+            Matrix where [i][j] is the travel time from location i to j
+            (0 on the diagonal)
+        """
+        return self._travel_time_array(tuple(map(tuple, locations))).tolist()
+    
+    @classmethod
+    @lru_cache(maxsize=128)
+    def _travel_time_array(cls, locations: Tuple[Tuple[float, float], ...]) -> np.ndarray:
+        """
+        Vectorized calculate_travel_time: distances for every pair are
+        computed in one NumPy broadcast instead of N² Python calls.
+        
+        A city trip fits in a small area, so the equirectangular projection
+        (one cos for the whole matrix, then a hypot per pair) is used when
+        the locations span at most EQUIRECT_MAX_SPAN_KM; wider spreads fall
+        back to haversine.
+        
+        Args:
+            locations: Tuple of (lat, lng) tuples
+        
+        Returns:
+            Read-only int32 array where [i][j] is the travel time from
+            location i to j (0 on the diagonal). Cached, so re-solving the
+            same places (e.g. with another num_days) reuses the matrix.
+        """
+        coords = np.radians(np.asarray(locations, dtype=np.float64))
+        lat = coords[:, 0]
+        lng = coords[:, 1]
+        
+        delta_lat = lat[None, :] - lat[:, None]
+        delta_lng = lng[None, :] - lng[:, None]
+        cos_lat0 = math.cos(lat.mean())
+        
+        span_km = cls.EARTH_RADIUS_KM * max(np.ptp(lat), np.ptp(lng) * cos_lat0)
+        if span_km <= cls.EQUIRECT_MAX_SPAN_KM:
+            # d = R × √(Δlat² + (cos(lat0)Δlng)²)
+            distance_km = cls.EARTH_RADIUS_KM * np.hypot(delta_lat, delta_lng * cos_lat0)
+        else:
+            # d = 2R × arcsin(√(sin²(Δlat/2) + cos(lat1)cos(lat2)sin²(Δlng/2)))
+            cos_lat = np.cos(lat)
+            a = (
+                np.sin(delta_lat / 2) ** 2 +
+                cos_lat[:, None] * cos_lat[None, :] *
+                np.sin(delta_lng / 2) ** 2
+            )
+            distance_km = 2 * cls.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        
+        # Same as calculate_travel_time: truncated minutes + 10 minute buffer
+        time_matrix = (distance_km / cls.AVERAGE_SPEED_KMH * 60).astype(np.int32) + 10
+        np.fill_diagonal(time_matrix, 0)
+        time_matrix.flags.writeable = False
+        
+        return time_matrix
+    
     def get_visit_duration(self, category: str) -> int:
         """Get estimated visit duration for a place category."""
-        return self.VISIT_DURATIONS.get(category.lower(), self.DEFAULT_VISIT_DURATION)
+        return self._category_defaults(category.lower())[2]
+    
+    @classmethod
+    @lru_cache(maxsize=64)
+    def _category_defaults(cls, category: str) -> Tuple[int, int, int]:
+        """
+        Category-based (earliest_start, latest_start, visit_duration) for a
+        lower-cased category. Places share a handful of categories, so this
+        is cached rather than recomputed per place.
+        """
+        visit_duration = cls.VISIT_DURATIONS.get(category, cls.DEFAULT_VISIT_DURATION)
+        if category in cls.CATEGORY_TIME_WINDOWS:
+            earliest, latest = cls.CATEGORY_TIME_WINDOWS[category]
+        else:
+            # Default: can visit anytime during the day
+            earliest = cls.DAY_START_TIME  # 9 AM
+            latest = cls.DAY_END_TIME - visit_duration  # Need time to complete visit
+        return earliest, latest, visit_duration
+    
+    @classmethod
+    def _clamp_time_window(cls, earliest: int, latest: int, visit_duration: int) -> Tuple[int, int]:
+        """Clamp a start window to the day boundaries, keeping latest >= earliest."""
+        earliest = max(earliest, cls.DAY_START_TIME)
+        latest = min(latest, cls.DAY_END_TIME - visit_duration)
+        latest = max(latest, earliest)  # Ensure latest >= earliest
+        return (earliest, latest)
+    
+    @classmethod
+    @lru_cache(maxsize=64)
+    def _category_time_window(cls, category: str) -> Tuple[int, int]:
+        """Final time window for a lower-cased category when opening hours are unknown."""
+        return cls._clamp_time_window(*cls._category_defaults(category))
     
     def get_time_window(
         self, 
@@ -230,50 +405,43 @@ class ItinerarySolver:
         """
         category = place.get("category", "").lower()
         opening_hours = place.get("opening_hours")
-        visit_duration = self.get_visit_duration(category)
+        
+        # 7-slot list indexed by day; 0=Sunday, which matches Google
+        hours = None
+        if opening_hours and opening_hours.get("by_day"):
+            hours = opening_hours["by_day"][day_of_week]
+        
+        if hours is None:
+            # No opening hours for this day - the window depends only on category
+            return self._category_time_window(category)
         
         # Start with category-based defaults
-        if category in self.CATEGORY_TIME_WINDOWS:
-            earliest, latest = self.CATEGORY_TIME_WINDOWS[category]
-        else:
-            # Default: can visit anytime during the day
-            earliest = self.DAY_START_TIME  # 9 AM
-            latest = self.DAY_END_TIME - visit_duration  # Need time to complete visit
+        earliest, latest, visit_duration = self._category_defaults(category)
         
-        # Refine with actual opening hours if available
-        if opening_hours and opening_hours.get("by_day"):
-            by_day = opening_hours["by_day"]
-            
-            # Convert day_of_week: our input uses 0=Sunday, which matches Google
-            if day_of_week in by_day:
-                hours = by_day[day_of_week]
-                place_opens = hours["open"]
-                place_closes = hours["close"]
-                
-                # Constrain our window to actual opening hours
-                # Can't start before it opens
-                earliest = max(earliest, place_opens)
-                # Must finish before it closes, so start no later than close - duration
-                latest = min(latest, place_closes - visit_duration)
-                
-                # Ensure valid window
-                if earliest > latest:
-                    # Place doesn't fit in our preferred window - use opening hours directly
-                    earliest = place_opens
-                    latest = max(place_opens, place_closes - visit_duration)
+        # Refine with actual opening hours
+        place_opens, place_closes = hours
         
-        # Clamp to day boundaries
-        earliest = max(earliest, self.DAY_START_TIME)
-        latest = min(latest, self.DAY_END_TIME - visit_duration)
-        latest = max(latest, earliest)  # Ensure latest >= earliest
+        # Constrain our window to actual opening hours
+        # Can't start before it opens
+        earliest = max(earliest, place_opens)
+        # Must finish before it closes, so start no later than close - duration
+        latest = min(latest, place_closes - visit_duration)
         
-        return (earliest, latest)
+        # Ensure valid window
+        if earliest > latest:
+            # Place doesn't fit in our preferred window - use opening hours directly
+            earliest = place_opens
+            latest = max(place_opens, place_closes - visit_duration)
+        
+        # Clamp to day boundaries
+        return self._clamp_time_window(earliest, latest, visit_duration)
     
     def create_data_model(
         self,
         places: List[Dict[str, Any]],
         hotel_coords: Tuple[float, float],
-        num_days: int = 1
+        num_days: int = 1,
+        free_depot_arcs: bool = False
     ) -> Dict[str, Any]:
         """
         Create the data model for OR-Tools routing solver.
@@ -282,6 +450,8 @@ class ItinerarySolver:
             places: List of place dicts with lat, lng, score, category
             hotel_coords: (lat, lng) tuple for the hotel/start point
             num_days: Number of days for the trip (becomes num_vehicles)
+            free_depot_arcs: Zero the depot row and column of the time matrix
+                instead of computing them (only meaningful for a synthetic depot)
         
         Returns:
             Data model dict for OR-Tools
@@ -290,63 +460,53 @@ class ItinerarySolver:
         # Places are indices 1 to N
         num_locations = len(places) + 1  # +1 for depot
         
-        # Build locations list: [depot, place1, place2, ...]
-        locations = [(hotel_coords[0], hotel_coords[1])]  # Depot first
-        for place in places:
-            lat = place.get("lat") or hotel_coords[0]
-            lng = place.get("lng") or hotel_coords[1]
-            locations.append((lat, lng))
-        
-        # Build time matrix (travel times between all pairs)
-        # time_matrix[i][j] = travel time from location i to location j
-        time_matrix = []
-        for i, (lat1, lng1) in enumerate(locations):
-            row = []
-            for j, (lat2, lng2) in enumerate(locations):
-                if i == j:
-                    row.append(0)
-                else:
-                    row.append(self.calculate_travel_time(lat1, lng1, lat2, lng2))
-            time_matrix.append(row)
-        
-        # Build service times (visit duration at each location)
-        # service_times[0] = 0 (no time spent at depot)
+        # Build every per-location list in a single pass over places:
+        # - locations: [depot, place1, place2, ...]
+        # - service_times: visit duration (service_times[0] = 0, no time spent at depot)
+        # - prizes: scores for Prize Collecting TSP (prizes[0] = 0, depot has no prize)
+        # - time_windows: (earliest_start, latest_start) in minutes from DAY_START;
+        #   the depot can be visited anytime (start/end of day)
+        hotel_lat, hotel_lng = hotel_coords
+        locations = [(hotel_lat, hotel_lng)]  # Depot first
         service_times = [0]  # Depot
-        for place in places:
-            category = place.get("category", "landmark")
-            service_times.append(self.get_visit_duration(category))
-        
-        # Build prizes (scores) for Prize Collecting TSP
-        # Higher score = higher priority to visit
-        # prizes[0] = 0 (depot has no prize)
         prizes = [0]  # Depot
+        time_windows = [(0, self.MAX_DAY_DURATION)]  # Depot
+        # Locals for the loop: bound methods and class constants
+        category_defaults = self._category_defaults
+        get_time_window = self.get_time_window
+        prize_scale = self.PRIZE_SCALE
+        day_start = self.DAY_START_TIME
+        max_day = self.MAX_DAY_DURATION
         for place in places:
+            locations.append((place.get("lat") or hotel_lat, place.get("lng") or hotel_lng))
+            # Same as get_visit_duration, without the extra call frame
+            service_times.append(category_defaults(place.get("category", "landmark").lower())[2])
             # Scale score to integer (OR-Tools needs ints)
-            score = place.get("score", 50.0)
-            prizes.append(int(score * 10))  # Scale up for precision
+            prizes.append(round(place.get("score", 50.0) * prize_scale))
+            earliest, latest = get_time_window(place)
+            # Convert from minutes-from-midnight to minutes-from-day-start
+            time_windows.append((max(0, earliest - day_start), min(max_day, latest - day_start)))
         
-        # Build penalty for NOT visiting (for Prize Collecting)
-        # Lower penalty = more likely to be dropped
-        # We want high-score places to have high penalty (don't want to drop them)
-        penalties = [0]  # Depot (must be visited, no penalty)
-        for place in places:
-            score = place.get("score", 50.0)
-            # Penalty proportional to score - dropping high-score places is expensive
-            penalties.append(int(score * 10))
+        # Penalty for NOT visiting (for Prize Collecting) is proportional to
+        # score - dropping high-score places is expensive. It is numerically
+        # identical to the prize, and neither list is mutated, so share it.
+        penalties = prizes
         
-        # Build time windows for each location
-        # time_windows[i] = (earliest_start, latest_start) in minutes from DAY_START
-        # Depot can be visited anytime (start/end of day)
-        time_windows = [(0, self.MAX_DAY_DURATION)]  # Depot
-        for place in places:
-            earliest, latest = self.get_time_window(place)
-            # Convert from minutes-from-midnight to minutes-from-day-start
-            earliest_relative = max(0, earliest - self.DAY_START_TIME)
-            latest_relative = min(self.MAX_DAY_DURATION, latest - self.DAY_START_TIME)
-            time_windows.append((earliest_relative, latest_relative))
+        # Build time matrix (travel times between all pairs)
+        # time_matrix[i][j] = travel time from location i to location j
+        if free_depot_arcs:
+            time_array = np.pad(self._travel_time_array(tuple(locations[1:])), ((1, 0), (1, 0)))
+        else:
+            time_array = self._travel_time_array(tuple(locations))
+        
+        # Transit time: travel time + service time at destination, kept as an
+        # int32 array until the single tolist() for RegisterTransitMatrix
+        time_matrix = time_array.tolist()
+        transit_matrix = (time_array + np.asarray(service_times, dtype=np.int32)[None, :]).tolist()
         
         data = {
             "time_matrix": time_matrix,
+            "transit_matrix": transit_matrix,
             "service_times": service_times,
             "prizes": prizes,
             "penalties": penalties,
@@ -357,6 +517,7 @@ class ItinerarySolver:
             "locations": locations,
             "places": places,  # Keep original place data
             "max_time_per_vehicle": self.MAX_DAY_DURATION,
+            "free_depot_arcs": free_depot_arcs,
         }
         
         return data
@@ -380,8 +541,25 @@ class ItinerarySolver:
         Returns:
             List of DayItinerary objects, one per day
         """
+        return self.solve_with_objective(places, hotel_coords, num_days, time_limit_seconds)[1]
+    
+    def solve_with_objective(
+        self,
+        places: List[Dict[str, Any]],
+        hotel_coords: Optional[Tuple[float, float]] = None,
+        num_days: int = 1,
+        time_limit_seconds: int = 10
+    ) -> Tuple[Optional[int], List[DayItinerary]]:
+        """
+        Same as solve, but also returns the OR-Tools objective value (lower is
+        better) so solutions from different search strategies can be compared.
+        
+        Returns:
+            (objective, days) - objective is None when OR-Tools wasn't run
+            (empty input or a single place) or found no solution
+        """
         if not places:
-            return [DayItinerary(day_number=i+1) for i in range(num_days)]
+            return None, [DayItinerary(day_number=i+1) for i in range(num_days)]
         
         # Filter places with valid coordinates
         valid_places = [
@@ -390,16 +568,43 @@ class ItinerarySolver:
         ]
         
         if not valid_places:
-            return [DayItinerary(day_number=i+1) for i in range(num_days)]
+            return None, [DayItinerary(day_number=i+1) for i in range(num_days)]
         
         # Calculate hotel coords (centroid) if not provided
+        free_depot_arcs = hotel_coords is None and self.fast_mode
         if hotel_coords is None:
-            avg_lat = sum(p["lat"] for p in valid_places) / len(valid_places)
-            avg_lng = sum(p["lng"] for p in valid_places) / len(valid_places)
-            hotel_coords = (avg_lat, avg_lng)
+            # Single pass over places into an (N, 2) array, then a column mean
+            coords = np.fromiter(
+                (v for p in valid_places for v in (p["lat"], p["lng"])),
+                dtype=np.float64,
+                count=2 * len(valid_places),
+            ).reshape(-1, 2)
+            avg_lat, avg_lng = coords.mean(axis=0)
+            hotel_coords = (float(avg_lat), float(avg_lng))
         
         # Create data model
-        data = self.create_data_model(valid_places, hotel_coords, num_days)
+        data = self.create_data_model(valid_places, hotel_coords, num_days, free_depot_arcs)
+        
+        # A single place needs no search - OR-Tools would route it on day 1
+        # whenever it fits - so skip the routing model setup for it
+        if len(valid_places) == 1:
+            routes = self._single_place_routes(data)
+            if routes is not None:
+                return None, self._days_from_routes(data, routes)
+        
+        # Search budget proportional to problem size, capped by the caller's limit
+        time_limit_seconds = min(
+            time_limit_seconds, max(1, len(valid_places) // self.PLACES_PER_SECOND)
+        )
+        
+        # Re-running the same places (e.g. the user regenerates a trip) reuses
+        # the routes found last time instead of searching again
+        cache_key = self._solve_cache_key(data, time_limit_seconds)
+        cached = _solve_cache.get(cache_key)
+        if cached is not None:
+            _solve_cache.move_to_end(cache_key)
+            objective, routes = cached
+            return objective, self._days_from_routes(data, routes)
         
         # Create routing index manager
         # Nodes: 0 = depot, 1..N = places
@@ -413,17 +618,11 @@ class ItinerarySolver:
         routing = pywrapcp.RoutingModel(manager)
         
         # ----- TIME DIMENSION -----
-        # Callback for time: travel time + service time at destination
-        # This way CumulVar represents "completion time" at each node
-        def time_callback(from_index, to_index):
-            """Returns travel time + service time at destination."""
-            from_node = manager.IndexToNode(from_index)
-            to_node = manager.IndexToNode(to_index)
-            travel_time = data["time_matrix"][from_node][to_node]
-            service_time = data["service_times"][to_node]
-            return travel_time + service_time
-        
-        transit_callback_index = routing.RegisterTransitCallback(time_callback)
+        # Transit time: travel time + service time at destination
+        # This way CumulVar represents "completion time" at each node.
+        # Registered as a matrix so OR-Tools evaluates arcs in C++ without
+        # calling back into Python during the search.
+        transit_callback_index = routing.RegisterTransitMatrix(data["transit_matrix"])
         
         # Set cost to minimize total time
         routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
@@ -432,135 +631,300 @@ class ItinerarySolver:
         # This constrains each vehicle (day) to MAX_DAY_DURATION
         routing.AddDimension(
             transit_callback_index,
-            120,  # Allow 2 hour slack (waiting time for time windows)
+            self.MAX_WAIT_TIME,  # Allow 2 hour slack (waiting time for time windows)
             data["max_time_per_vehicle"],  # Max time per vehicle
             True,  # Start cumul at zero (each day starts fresh)
             "Time"
         )
         time_dimension = routing.GetDimensionOrDie("Time")
         
-        # ----- TIME WINDOW CONSTRAINTS -----
-        # Apply time windows to each node (except depot which is flexible)
-        for node in range(1, data["num_locations"]):  # Skip depot (node 0)
-            index = manager.NodeToIndex(node)
-            earliest, latest = data["time_windows"][node]
-            time_dimension.CumulVar(index).SetRange(earliest, latest)
+        # ----- TIME WINDOW CONSTRAINTS & PRIZE COLLECTING -----
+        # One pass over places (skipping the depot, which is flexible):
+        # - apply each node's time window
+        # - add a disjunction so each place can be visited OR dropped, with a
+        #   penalty for NOT visiting it (higher = solver tries harder to include it)
+        # Bound methods are hoisted since every call crosses into C++.
+        node_to_index = manager.NodeToIndex
+        cumul_var = time_dimension.CumulVar
+        add_disjunction = routing.AddDisjunction
+        for node, (earliest, latest), penalty in zip(
+            range(1, data["num_locations"]),
+            data["time_windows"][1:],
+            data["penalties"][1:],
+        ):
+            index = node_to_index(node)
+            cumul_var(index).SetRange(earliest, latest)
+            add_disjunction([index], penalty)
         
         # Minimize total time across all days
         for vehicle_id in range(data["num_vehicles"]):
             time_dimension.SetSpanCostCoefficientForVehicle(1, vehicle_id)
         
-        # ----- PRIZE COLLECTING (Allow Dropping Nodes) -----
-        # Add disjunctions - each place can be visited OR dropped (with penalty)
-        for node in range(1, data["num_locations"]):  # Skip depot
-            index = manager.NodeToIndex(node)
-            # Penalty for NOT visiting this node
-            # Higher penalty = solver tries harder to include it
-            penalty = data["penalties"][node]
-            routing.AddDisjunction([index], penalty)
-        
         # ----- SOLVER SETTINGS -----
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
-        )
-        search_parameters.local_search_metaheuristic = (
-            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
-        )
+        search_parameters.first_solution_strategy = self.first_solution_strategy
+        search_parameters.local_search_metaheuristic = self.local_search_metaheuristic
         search_parameters.time_limit.seconds = time_limit_seconds
+        search_parameters.solution_limit = self.SOLUTION_LIMIT
+        # Light propagation during search and no search logging
+        search_parameters.use_full_propagation = False
+        search_parameters.log_search = False
         
         # Solve
         solution = routing.SolveWithParameters(search_parameters)
         
         # Extract solution
         if solution:
-            return self._extract_solution(data, manager, routing, solution)
+            objective = solution.ObjectiveValue()
+            routes = self._extract_routes(data, manager, routing, solution)
+            _solve_cache[cache_key] = (objective, routes)
+            while len(_solve_cache) > SOLVE_CACHE_MAX_ENTRIES:
+                _solve_cache.popitem(last=False)
+            return objective, self._days_from_routes(data, routes)
         else:
             # No solution found - return empty days
             print("WARNING: No solution found by OR-Tools solver")
-            return [DayItinerary(day_number=i+1) for i in range(num_days)]
+            return None, [DayItinerary(day_number=i+1) for i in range(num_days)]
+    
+    def solve_parallel(
+        self,
+        places: List[Dict[str, Any]],
+        hotel_coords: Optional[Tuple[float, float]] = None,
+        num_days: int = 1,
+        time_limit_seconds: int = 10,
+        num_workers: int = 4
+    ) -> List[DayItinerary]:
+        """
+        Solve with several search strategies at once and keep the best result.
+        
+        The OR-Tools routing solver is single-threaded, so each strategy in
+        PARALLEL_STRATEGIES runs in its own process within the same time
+        limit; the solution with the lowest objective wins.
+        
+        Args:
+            places: List of place dicts (must have lat, lng, score, category)
+            hotel_coords: (lat, lng) for hotel. If None, uses centroid of places.
+            num_days: Number of days for the trip
+            time_limit_seconds: Max solver time per worker
+            num_workers: Number of strategies (and processes) to run
+        
+        Returns:
+            List of DayItinerary objects, one per day
+        """
+        strategies = PARALLEL_STRATEGIES[:max(1, num_workers)]
+        
+        with ProcessPoolExecutor(max_workers=len(strategies)) as executor:
+            futures = [
+                executor.submit(
+                    _solve_with_strategy,
+                    first_solution_strategy, metaheuristic,
+                    places, hotel_coords, num_days, time_limit_seconds,
+                    self.fast_mode,
+                )
+                for first_solution_strategy, metaheuristic in strategies
+            ]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"WARNING: Parallel solver worker failed: {type(e).__name__}: {e}")
+        
+        solved = [(objective, days) for objective, days in results if objective is not None]
+        if solved:
+            return min(solved, key=lambda result: result[0])[1]
+        if results:
+            # Nothing solved (e.g. no places) - every worker returned empty days
+            return results[0][1]
+        return [DayItinerary(day_number=i+1) for i in range(num_days)]
+    
+    def _single_place_routes(self, data: Dict[str, Any]) -> Optional[List[List[Tuple[int, int]]]]:
+        """
+        Route a lone place on day 1 without OR-Tools.
+        
+        Mirrors the routing model: the Time dimension (cumul = completion
+        time, waiting slack up to MAX_WAIT_TIME, day length) and the objective
+        (arc costs plus day span, against the drop penalty), so the result is
+        what OR-Tools finds. Two or more places always go to OR-Tools: with no
+        per-day cost it packs places into as few day tours as it can, which a
+        simple split across days does not reproduce.
+        
+        Returns:
+            Routes (see _days_from_routes), or None if the place doesn't fit
+            a day (OR-Tools then decides)
+        """
+        time_matrix = data["time_matrix"]
+        earliest, latest = data["time_windows"][1]
+        arrive_cost = time_matrix[0][1] + data["service_times"][1]
+        cumul = arrive_cost
+        if cumul < earliest:
+            if earliest - cumul > self.MAX_WAIT_TIME:
+                return None
+            cumul = earliest
+        if cumul > latest or cumul + time_matrix[1][0] > data["max_time_per_vehicle"]:
+            return None
+        
+        empty_days = [[] for _ in range(data["num_vehicles"] - 1)]
+        # Visiting costs both arcs plus the day's span; dropping costs the penalty
+        visit_cost = arrive_cost + time_matrix[1][0] + cumul + time_matrix[1][0]
+        if visit_cost > data["penalties"][1]:
+            return [[]] + empty_days
+        return [[(1, cumul)]] + empty_days
     
-    def _extract_solution(
+    def _days_from_routes(
         self,
         data: Dict[str, Any],
-        manager: pywrapcp.RoutingIndexManager,
-        routing: pywrapcp.RoutingModel,
-        solution: pywrapcp.Assignment
+        routes: List[List[Tuple[int, int]]]
     ) -> List[DayItinerary]:
         """
-        Extract the solution from OR-Tools into DayItinerary objects.
+        Build DayItinerary objects from per-day routes.
         
-        Each vehicle (day) gets its own itinerary.
+        Args:
+            data: Data model from create_data_model
+            routes: One list per day of (node, cumul_time) for each visited
+                place in order, where cumul_time is the Time dimension value
+                (completion time at the node, minutes from day start)
         """
-        time_dimension = routing.GetDimensionOrDie("Time")
+        places = data["places"]
+        service_times = data["service_times"]
+        time_matrix = data["time_matrix"]
         days = []
         
-        for vehicle_id in range(data["num_vehicles"]):
+        for vehicle_id, route in enumerate(routes):
             day = DayItinerary(day_number=vehicle_id + 1)
+            prev_node = 0
             
-            index = routing.Start(vehicle_id)
-            previous_index = index
-            
-            while not routing.IsEnd(index):
-                node = manager.IndexToNode(index)
-                time_var = time_dimension.CumulVar(index)
-                cumul_time = solution.Value(time_var)
+            for node, cumul_time in route:
+                # Get place data (node - 1 because depot is 0)
+                place = places[node - 1]
+                duration = service_times[node]
                 
-                # Skip depot (node 0)
-                if node != 0:
-                    # Get place data (node - 1 because depot is 0)
-                    place = data["places"][node - 1]
-                    
-                    duration = data["service_times"][node]
-                    
-                    # CumulVar includes service time, so we need to subtract it
-                    # to get the actual arrival time
-                    # cumul_time = time when we FINISH at this location
-                    # arrival_time = cumul_time - duration (when we ARRIVE)
-                    arrival_time = cumul_time - duration
-                    departure_time = cumul_time
-                    
-                    item = ItineraryItem(
-                        place_id=place.get("place_id", f"place_{node}"),
-                        name=place.get("name", f"Place {node}"),
-                        lat=place.get("lat", 0),
-                        lng=place.get("lng", 0),
-                        arrival_time=self.DAY_START_TIME + arrival_time,
-                        departure_time=self.DAY_START_TIME + departure_time,
-                        duration=duration,
-                        score=place.get("score", 0),
-                        category=place.get("category", ""),
-                        why=place.get("why", ""),
-                        formatted_address=place.get("formatted_address"),
-                        rating=place.get("rating"),
-                        review_count=place.get("user_ratings_total"),
-                        types=place.get("types"),
-                        score_breakdown=place.get("score_breakdown"),
-                    )
-                    
-                    day.items.append(item)
-                    day.total_visit_time += duration
-                    day.total_score += place.get("score", 0)
-                    
-                    # Calculate travel time from previous location
-                    if previous_index != routing.Start(vehicle_id):
-                        prev_node = manager.IndexToNode(previous_index)
-                        travel_time = data["time_matrix"][prev_node][node]
-                        day.total_travel_time += travel_time
+                # CumulVar includes service time, so we need to subtract it
+                # to get the actual arrival time
+                # cumul_time = time when we FINISH at this location
+                # arrival_time = cumul_time - duration (when we ARRIVE)
+                day.items.append(self._build_item(place, node, cumul_time - duration, duration))
+                day.total_visit_time += duration
+                day.total_score += place.get("score", 0)
                 
-                previous_index = index
-                index = solution.Value(routing.NextVar(index))
+                # Travel time from the previous place (not from the hotel)
+                if prev_node != 0:
+                    day.total_travel_time += time_matrix[prev_node][node]
+                prev_node = node
             
             days.append(day)
         
         return days
+    
+    def _build_item(
+        self,
+        place: Dict[str, Any],
+        node: int,
+        arrival_time: int,
+        duration: int
+    ) -> ItineraryItem:
+        """
+        Build an ItineraryItem for a visited place.
+        
+        Args:
+            place: Place dict from the data model
+            node: Routing node of the place (depot is 0)
+            arrival_time: Arrival in minutes from day start
+            duration: Visit duration in minutes
+        """
+        return ItineraryItem(
+            place_id=place.get("place_id", f"place_{node}"),
+            name=place.get("name", f"Place {node}"),
+            lat=place.get("lat", 0),
+            lng=place.get("lng", 0),
+            arrival_time=self.DAY_START_TIME + arrival_time,
+            departure_time=self.DAY_START_TIME + arrival_time + duration,
+            duration=duration,
+            score=place.get("score", 0),
+            category=place.get("category", ""),
+            why=place.get("why", ""),
+            formatted_address=place.get("formatted_address"),
+            rating=place.get("rating"),
+            review_count=place.get("user_ratings_total"),
+            types=place.get("types"),
+            score_breakdown=place.get("score_breakdown"),
+        )
+    
+    def _solve_cache_key(
+        self,
+        data: Dict[str, Any],
+        time_limit_seconds: int
+    ) -> tuple:
+        """Build a hashable key from every input the routing model is built from."""
+        return (
+            tuple(data["locations"]),
+            data["free_depot_arcs"],
+            tuple(data["service_times"]),
+            tuple(data["prizes"]),
+            tuple(data["time_windows"]),
+            data["num_vehicles"],
+            time_limit_seconds,
+            self.first_solution_strategy,
+            self.local_search_metaheuristic,
+        )
+    
+    def _extract_routes(
+        self,
+        data: Dict[str, Any],
+        manager: pywrapcp.RoutingIndexManager,
+        routing: pywrapcp.RoutingModel,
+        solution: pywrapcp.Assignment
+    ) -> List[List[Tuple[int, int]]]:
+        """
+        Extract the solution from OR-Tools as per-day routes.
+        
+        Each vehicle (day) gets its own route of (node, cumul_time) pairs,
+        depot excluded.
+        """
+        # Every call below crosses into C++, so bind the methods once
+        value = solution.Value
+        next_var = routing.NextVar
+        is_end = routing.IsEnd
+        cumul_var = routing.GetDimensionOrDie("Time").CumulVar
+        index_to_node = manager.IndexToNode
+        
+        # Walk each route first, collecting only the indices
+        indices_per_vehicle = []
+        for vehicle_id in range(data["num_vehicles"]):
+            indices = []
+            index = value(next_var(routing.Start(vehicle_id)))
+            while not is_end(index):
+                indices.append(index)
+                index = value(next_var(index))
+            indices_per_vehicle.append(indices)
+        
+        # Then fetch nodes and cumul times in one pass per route
+        return [
+            [(index_to_node(index), value(cumul_var(index))) for index in indices]
+            for indices in indices_per_vehicle
+        ]
+
+
+def _solve_with_strategy(
+    first_solution_strategy: int,
+    local_search_metaheuristic: int,
+    places: List[Dict[str, Any]],
+    hotel_coords: Optional[Tuple[float, float]],
+    num_days: int,
+    time_limit_seconds: int,
+    fast_mode: bool
+) -> Tuple[Optional[int], List[DayItinerary]]:
+    """solve_parallel worker: run one strategy in a separate process."""
+    solver = ItinerarySolver(first_solution_strategy, local_search_metaheuristic, fast_mode)
+    return solver.solve_with_objective(places, hotel_coords, num_days, time_limit_seconds)
 
 
 def solve_itinerary(
     places: List[Dict[str, Any]],
     hotel_coords: Optional[Tuple[float, float]] = None,
     num_days: int = 1,
-    time_limit_seconds: int = 10
+    time_limit_seconds: int = 10,
+    num_workers: int = 1
 ) -> List[Dict[str, Any]]:
     """
     Convenience function to solve itinerary and return dicts.
@@ -570,12 +934,19 @@ def solve_itinerary(
         hotel_coords: Optional (lat, lng) for hotel
         num_days: Number of days
         time_limit_seconds: Solver time limit
+        num_workers: Run this many search strategies in parallel processes
+            and keep the best solution (1 = solve in-process)
     
     Returns:
         List of day dicts with items
     """
     solver = ItinerarySolver()
-    day_itineraries = solver.solve(places, hotel_coords, num_days, time_limit_seconds)
+    if num_workers > 1:
+        day_itineraries = solver.solve_parallel(
+            places, hotel_coords, num_days, time_limit_seconds, num_workers
+        )
+    else:
+        day_itineraries = solver.solve(places, hotel_coords, num_days, time_limit_seconds)
     return [day.to_dict() for day in day_itineraries]
 
 
@@ -599,7 +970,7 @@ if __name__ == "__main__":
         {"name": "Miku Restaurant", "lat": 49.2876, "lng": -123.1134, "score": 85.0, "category": "dinner", "why": "Fine dining sushi", "place_id": "10"},
         # Museum with opening hours
         {"name": "Museum of Anthropology", "lat": 49.2695, "lng": -123.2590, "score": 80.0, "category": "museum", "why": "Cultural artifacts", "place_id": "11",
-         "opening_hours": {"by_day": {1: {"open": 600, "close": 1020}}}},  # 10 AM - 5 PM Monday
+         "opening_hours": {"by_day": [None, (600, 1020), None, None, None, None, None]}},  # 10 AM - 5 PM Monday
     ]
     
     # Hotel at downtown Vancouver
@@ -0,0 +1,102 @@
+"""
+Tests for the streamed candidate parser (no API calls)
+"""
+from agents import CandidateStreamParser, parse_candidates
+
+RESPONSE = """[
+  {"name": "Senso-ji Temple", "search_query": "Senso-ji Temple Asakusa Tokyo", "category": "cultural", "why": "Tokyo's oldest temple."},
+  {"name": "Bar } and ] club", "search_query": "Bar Tokyo", "category": "nightlife", "why": "Quotes \\"inside\\" and a backslash \\\\ too."},
+  {"name": "Tokyo Skytree", "search_query": "Tokyo Skytree Tokyo", "category": "landmark", "why": "Views from 450 m."}
+]"""
+
+
+def _feed_all(parser, text, chunk_size):
+    items = []
+    for i in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[i:i + chunk_size]))
+    return items
+
+
+def test_chunk_boundaries():
+    """Every chunking of the same text yields the same objects"""
+    print("="*60)
+    print("PARSER TEST 1: Chunk boundaries")
+    print("="*60)
+    expected = parse_candidates(RESPONSE)
+    for chunk_size in (1, 2, 3, 7, 16, 64, len(RESPONSE)):
+        parser = CandidateStreamParser()
+        items = _feed_all(parser, RESPONSE, chunk_size)
+        print(f"chunk size {chunk_size:>3}: {len(items)} objects, complete: {parser.complete}")
+        assert items == expected
+        assert parser.complete
+        assert parser.skipped == 0
+
+
+def test_strings_with_brackets():
+    """Braces, brackets and escaped quotes inside strings don't end an object"""
+    print("\n" + "="*60)
+    print("PARSER TEST 2: Strings containing } and ]")
+    print("="*60)
+    items = _feed_all(CandidateStreamParser(), RESPONSE, 5)
+    print(f"name: {items[1]['name']!r}, why: {items[1]['why']!r}")
+    assert items[1]["name"] == "Bar } and ] club"
+    assert items[1]["why"] == 'Quotes "inside" and a backslash \\ too.'
+
+
+def test_fenced_prefix():
+    """A markdown fence before the array (and after it) is ignored"""
+    print("\n" + "="*60)
+    print("PARSER TEST 3: Fenced response")
+    print("="*60)
+    parser = CandidateStreamParser()
+    items = _feed_all(parser, "```json\n" + RESPONSE + "\n```", 4)
+    print(f"{len(items)} objects, complete: {parser.complete}")
+    assert [item["name"] for item in items] == ["Senso-ji Temple", "Bar } and ] club", "Tokyo Skytree"]
+    assert parser.complete
+
+
+def test_truncated_response():
+    """A response cut off mid-object yields only the finished objects and is not complete"""
+    print("\n" + "="*60)
+    print("PARSER TEST 4: Truncated response (max_tokens)")
+    print("="*60)
+    parser = CandidateStreamParser()
+    cut = RESPONSE.index('"Views')
+    items = _feed_all(parser, RESPONSE[:cut], 8)
+    print(f"{len(items)} objects, complete: {parser.complete}")
+    assert len(items) == 2
+    assert not parser.complete
+
+
+def test_malformed_object_is_skipped():
+    """A malformed object is skipped and later objects still arrive"""
+    print("\n" + "="*60)
+    print("PARSER TEST 5: Malformed object mid-stream")
+    print("="*60)
+    parser = CandidateStreamParser()
+    text = '[{"name": "A"}, {"name": B}, {"name": "C"}]'
+    items = _feed_all(parser, text, 3)
+    print(f"objects: {items}, skipped: {parser.skipped}, complete: {parser.complete}")
+    assert items == [{"name": "A"}, {"name": "C"}]
+    assert parser.skipped == 1
+    assert parser.complete
+
+
+def test_buffer_is_trimmed():
+    """Decoded objects are dropped from the buffer instead of accumulating"""
+    print("\n" + "="*60)
+    print("PARSER TEST 6: Buffer trimming")
+    print("="*60)
+    parser = CandidateStreamParser()
+    parser.feed('[{"name": "A"}, {"name": "B"}, {"na')
+    print(f"buffer after two objects: {parser._buffer!r}")
+    assert parser._buffer == '{"na'
+
+
+if __name__ == "__main__":
+    test_chunk_boundaries()
+    test_strings_with_brackets()
+    test_fenced_prefix()
+    test_truncated_response()
+    test_malformed_object_is_skipped()
+    test_buffer_is_trimmed()
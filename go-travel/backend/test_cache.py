@@ -0,0 +1,63 @@
+"""
+Tests for the in-process cache layer (runs without Redis)
+"""
+import asyncio
+
+import cache
+from cache import cache_get_many, cache_set
+
+
+def test_local_round_trip():
+    """A cached value comes back equal, and callers get their own copy"""
+    print("="*60)
+    print("CACHE TEST 1: Local layer round-trip")
+    print("="*60)
+    value = [{"name": "Tokyo Tower", "lat": 35.6586, "lng": 139.7454}]
+    asyncio.run(cache_set("test:round-trip", value, 60))
+
+    first, missing = asyncio.run(cache_get_many(["test:round-trip", "test:absent"]))
+    print(f"Hit: {first}, miss: {missing}")
+    assert first == value
+    assert missing is None
+
+    # Mutating a returned value must not change the cached copy
+    first[0]["name"] = "changed"
+    again = asyncio.run(cache_get_many(["test:round-trip"]))[0]
+    assert again == value
+
+
+def test_unencodable_value_is_skipped():
+    """Values orjson can't encode are skipped with a warning, not raised"""
+    print("\n" + "="*60)
+    print("CACHE TEST 2: Unencodable value (int dict keys)")
+    print("="*60)
+    place = {"name": "Louvre", "opening_hours": {"by_day": {1: {"open": 540, "close": 1080}}}}
+    asyncio.run(cache_set("test:int-keys", place, 60))
+
+    cached = asyncio.run(cache_get_many(["test:int-keys"]))[0]
+    print(f"Cached: {cached}")
+    assert cached is None
+
+
+def test_local_eviction():
+    """The local layer never holds more than LOCAL_CACHE_MAX_ENTRIES"""
+    print("\n" + "="*60)
+    print("CACHE TEST 3: Local layer eviction")
+    print("="*60)
+    for i in range(cache.LOCAL_CACHE_MAX_ENTRIES + 5):
+        asyncio.run(cache_set(f"test:evict:{i}", i, 60))
+
+    oldest, newest = asyncio.run(cache_get_many(
+        ["test:evict:0", f"test:evict:{cache.LOCAL_CACHE_MAX_ENTRIES + 4}"]
+    ))
+    print(f"Entries: {len(cache._local)}, oldest: {oldest}, newest: {newest}")
+    assert len(cache._local) <= cache.LOCAL_CACHE_MAX_ENTRIES
+    if cache.get_client() is None:
+        assert oldest is None
+    assert newest == cache.LOCAL_CACHE_MAX_ENTRIES + 4
+
+
+if __name__ == "__main__":
+    test_local_round_trip()
+    test_unencodable_value_is_skipped()
+    test_local_eviction()
@@ -0,0 +1,76 @@
+"""
+Tests for the per-loop HTTP sessions (no network calls)
+"""
+import asyncio
+import gc
+import warnings
+
+from places_api import close_session, get_session
+import weather
+from weather import get_weather_session
+
+
+def test_new_loop_closes_old_session():
+    """Each asyncio.run gets its own session, closed when that loop shuts down"""
+    print("="*60)
+    print("SESSION TEST 1: Sessions across asyncio.run calls")
+    print("="*60)
+    for name, get in (("places", get_session), ("weather", get_weather_session)):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            first = asyncio.run(get())
+            second = asyncio.run(get())
+            gc.collect()
+        unclosed = [w for w in caught if issubclass(w.category, ResourceWarning)]
+        print(f"{name}: distinct: {first is not second}, closed: {first.closed}, {second.closed}, "
+              f"ResourceWarnings: {len(unclosed)}")
+        assert first is not second
+        assert first.closed and second.closed
+        assert not unclosed
+
+
+def test_session_reused_within_loop():
+    """One loop keeps one session until close_session"""
+    print("\n" + "="*60)
+    print("SESSION TEST 2: Reuse and close within one loop")
+    print("="*60)
+
+    async def run():
+        first = await get_session()
+        same = await get_session()
+        await close_session()
+        after_close = await get_session()
+        await close_session()
+        return first, same, after_close
+
+    first, same, after_close = asyncio.run(run())
+    print(f"Reused: {first is same}, closed: {first.closed}, new after close: {after_close is not first}")
+    assert first is same
+    assert first.closed
+    assert after_close is not first and after_close.closed
+
+
+def test_sync_loop_keeps_its_own_session():
+    """Async callers on other loops don't replace the weather sync loop's session"""
+    print("\n" + "="*60)
+    print("SESSION TEST 3: Weather sync loop mixed with asyncio.run")
+    print("="*60)
+
+    def sync_session():
+        return asyncio.run_coroutine_threadsafe(
+            get_weather_session(), weather._get_sync_loop()
+        ).result(timeout=weather.WEATHER_SYNC_TIMEOUT_SECONDS)
+
+    before = sync_session()
+    async_session = asyncio.run(get_weather_session())
+    after = sync_session()
+    print(f"Sync session kept: {before is after}, open: {not after.closed}, "
+          f"async session separate and closed: {async_session is not after and async_session.closed}")
+    assert before is after and not after.closed
+    assert async_session is not after and async_session.closed
+
+
+if __name__ == "__main__":
+    test_new_loop_closes_old_session()
+    test_session_reused_within_loop()
+    test_sync_loop_keeps_its_own_session()
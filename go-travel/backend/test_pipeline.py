@@ -1,18 +1,22 @@
 """
 Full pipeline integration test - simulates what main.py does
 """
+import asyncio
 import sys
 sys.path.insert(0, '.')
 
 from agents import generate_candidates
-from places_api import enrich_candidates_sync, get_photo_url
+from places_api import enrich_candidates, get_photo_url
 from scoring import rank_places
-from weather import fetch_weather_sync
+from weather import fetch_weather
 from solver import solve_itinerary
 from response_models import format_itinerary_response, format_error_response
 import json
 
 def test_full_pipeline():
+    return asyncio.run(run_pipeline())
+
+async def run_pipeline():
     # Inputs (simulating frontend request)
     city = "Vancouver"
     vibe = "nature lover"
@@ -27,7 +31,7 @@ def test_full_pipeline():
     
     # Step 1: Generate candidates
     print("\n[1] Generating candidates with Claude...")
-    candidates = generate_candidates(city, vibe, num_places)
+    candidates = await generate_candidates(city, vibe, num_places)
     if not candidates:
         print("ERROR: No candidates generated")
         return
@@ -37,7 +41,7 @@ def test_full_pipeline():
     
     # Step 2: Enrich with Google Places
     print("\n[2] Enriching with Google Places...")
-    enriched = enrich_candidates_sync(candidates)
+    enriched = await enrich_candidates(candidates)
     for p in enriched:
         if p.get("photo_reference"):
             p["photo_url"] = get_photo_url(p["photo_reference"])
@@ -46,7 +50,7 @@ def test_full_pipeline():
     
     # Step 3: Fetch weather
     print("\n[3] Fetching weather...")
-    weather = fetch_weather_sync(city)
+    weather = await fetch_weather(city)
     if weather:
         print(f"    Weather: {weather.get('temp')}°C, {weather.get('description')}")
     else:
@@ -2,7 +2,7 @@
 Test the full response format with solver output
 """
 from solver import solve_itinerary
-from response_models import format_itinerary_response, format_error_response
+from response_models import ItineraryResponse, format_itinerary_response, format_error_response
 import json
 
 # Simulate what main.py would do
@@ -88,6 +88,36 @@ def test_error_response():
     print(json.dumps(error_response, indent=2))
 
 
+def test_formatter_matches_schema():
+    """Formatted responses validate against ItineraryResponse, which forbids extra keys"""
+    print("\n" + "="*60)
+    print("SCHEMA TEST: formatter output vs ItineraryResponse")
+    print("="*60)
+    
+    # Solver items carry extra keys (types, score_breakdown, ...) that must not leak
+    places = [
+        {"place_id": "p1", "name": "Louvre Museum", "lat": 48.8606, "lng": 2.3376, "score": 62, "category": "museum", "why": "World-famous art", "rating": 4.7, "review_count": 250000, "types": ["museum", "tourist_attraction"], "score_breakdown": {"base_score": 65, "distance_km": 1.2, "distance_multiplier": 0.95, "weather_multiplier": 1.0, "is_outdoor": False}},
+        {"place_id": "p2", "name": "Tuileries Garden", "lat": 48.8634, "lng": 2.3275, "score": 55, "category": "nature", "why": "Formal gardens", "rating": 4.6, "review_count": 90000, "types": ["park"], "score_breakdown": {"base_score": 80, "distance_km": 1.5, "distance_multiplier": 0.9, "weather_multiplier": 0.3, "is_outdoor": True, "weather_condition": "Rain", "temperature": 8.0}},
+    ]
+    weather = {"main": "Rain", "description": "light rain", "temp": 8.0, "feels_like": 6.5, "humidity": 90}
+    solver_output = solve_itinerary(places, (48.8566, 2.3522), num_days=2, time_limit_seconds=5)
+    
+    response = format_itinerary_response(
+        city="Paris",
+        vibe="",
+        num_days=2,
+        start_date="2026-03-01",
+        solver_output=solver_output,
+        original_places=places,
+        hotel_coords=(48.8566, 2.3522),
+        weather=weather,
+    )
+    ItineraryResponse.model_validate(response)
+    ItineraryResponse.model_validate(format_error_response("boom", city="Paris"))
+    print("Formatted and error responses validate with extra='forbid'")
+
+
 if __name__ == "__main__":
     test_full_pipeline()
     test_error_response()
+    test_formatter_matches_schema()
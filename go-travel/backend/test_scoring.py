@@ -4,120 +4,111 @@ Comprehensive Scoring Test
 Tests the scoring system across multiple cities with real weather data.
 """
 
+import io
 import json
-from weather import fetch_weather_sync
+import sys
+from weather import fetch_weather_many_sync
 from scoring import UtilityScorer, rank_places
 
+# Test places built for every city: (name suffix, base lat, lng, fields).
+# Each city shifts the base latitude north by 0.1 degrees.
+TEST_PLACE_TEMPLATES = [
+    ("Central Park", 49.3, -123.1, {
+        "types": ["park", "tourist_attraction"],
+        "rating": 4.7,
+        "user_ratings_total": 25000,
+        "category": "nature",
+        "why": "Beautiful urban park."
+    }),
+    ("Art Museum", 49.3, -123.11, {
+        "types": ["museum", "tourist_attraction"],
+        "rating": 4.6,
+        "user_ratings_total": 15000,
+        "category": "museum",
+        "why": "World-class art collection."
+    }),
+    ("Zoo", 49.31, -123.12, {
+        "types": ["zoo", "tourist_attraction"],
+        "rating": 4.4,
+        "user_ratings_total": 8000,
+        "category": "nature",
+        "why": "Amazing wildlife exhibits."
+    }),
+    ("Famous Restaurant", 49.3, -123.1, {
+        "types": ["restaurant"],
+        "rating": 4.8,
+        "user_ratings_total": 5000,
+        "category": "restaurant",
+        "why": "Michelin-starred dining."
+    }),
+    ("Hidden Gem Cafe", 49.3, -123.1, {
+        "types": ["cafe"],
+        "rating": 4.9,
+        "user_ratings_total": 50,  # Few reviews
+        "category": "restaurant",
+        "why": "Local favorite, few tourists."
+    }),
+    ("Beach", 49.35, -123.15, {  # 5km away
+        "types": ["beach", "natural_feature"],
+        "rating": 4.5,
+        "user_ratings_total": 12000,
+        "category": "nature",
+        "why": "Beautiful sandy beach."
+    }),
+    ("Shopping Mall", 49.3, -123.1, {
+        "types": ["shopping_mall"],
+        "rating": 4.2,
+        "user_ratings_total": 3000,
+        "category": "shopping",
+        "why": "Premium shopping experience."
+    }),
+    ("Historic Temple", 49.32, -123.13, {
+        "types": ["place_of_worship", "tourist_attraction"],
+        "rating": 4.6,
+        "user_ratings_total": 20000,
+        "category": "cultural",
+        "why": "Ancient cultural landmark."
+    }),
+]
+
+
 def test_scoring():
     scorer = UtilityScorer()
     
     # Test cities with different weather conditions
     cities = ["Vancouver", "Tokyo", "Paris", "London", "Sydney", "New York"]
     
-    for city in cities:
-        print(f"\n{'='*60}")
-        print(f"CITY: {city}")
-        print('='*60)
+    # Fetch real weather for every city at once
+    weather_by_city = fetch_weather_many_sync(cities)
+    
+    for idx, city in enumerate(cities):
+        # Buffer each city's report and write it once
+        out = io.StringIO()
+        print(f"\n{'='*60}", file=out)
+        print(f"CITY: {city}", file=out)
+        print('='*60, file=out)
         
-        # Fetch real weather
-        weather = fetch_weather_sync(city)
+        weather = weather_by_city[city]
         if weather:
-            print(f"Weather: {weather['main']} ({weather['description']})")
-            print(f"Temperature: {weather['temp']}°C (feels like {weather['feels_like']}°C)")
-            print(f"Humidity: {weather['humidity']}%")
+            print(f"Weather: {weather['main']} ({weather['description']})", file=out)
+            print(f"Temperature: {weather['temp']}°C (feels like {weather['feels_like']}°C)", file=out)
+            print(f"Humidity: {weather['humidity']}%", file=out)
         else:
-            print("Weather: Unable to fetch")
+            print("Weather: Unable to fetch", file=out)
             weather = None
         
-        # Create test places for this city
+        # Create test places for this city, shifted north per city
+        lat_offset = idx * 0.1
         test_places = [
-            {
-                "name": f"{city} Central Park",
-                "lat": 49.3 + cities.index(city) * 0.1,
-                "lng": -123.1,
-                "types": ["park", "tourist_attraction"],
-                "rating": 4.7,
-                "user_ratings_total": 25000,
-                "category": "nature",
-                "why": "Beautiful urban park."
-            },
-            {
-                "name": f"{city} Art Museum",
-                "lat": 49.3 + cities.index(city) * 0.1,
-                "lng": -123.11,
-                "types": ["museum", "tourist_attraction"],
-                "rating": 4.6,
-                "user_ratings_total": 15000,
-                "category": "museum",
-                "why": "World-class art collection."
-            },
-            {
-                "name": f"{city} Zoo",
-                "lat": 49.31 + cities.index(city) * 0.1,
-                "lng": -123.12,
-                "types": ["zoo", "tourist_attraction"],
-                "rating": 4.4,
-                "user_ratings_total": 8000,
-                "category": "nature",
-                "why": "Amazing wildlife exhibits."
-            },
-            {
-                "name": f"{city} Famous Restaurant",
-                "lat": 49.3 + cities.index(city) * 0.1,
-                "lng": -123.1,
-                "types": ["restaurant"],
-                "rating": 4.8,
-                "user_ratings_total": 5000,
-                "category": "restaurant",
-                "why": "Michelin-starred dining."
-            },
-            {
-                "name": f"{city} Hidden Gem Cafe",
-                "lat": 49.3 + cities.index(city) * 0.1,
-                "lng": -123.1,
-                "types": ["cafe"],
-                "rating": 4.9,
-                "user_ratings_total": 50,  # Few reviews
-                "category": "restaurant",
-                "why": "Local favorite, few tourists."
-            },
-            {
-                "name": f"{city} Beach",
-                "lat": 49.35 + cities.index(city) * 0.1,  # 5km away
-                "lng": -123.15,
-                "types": ["beach", "natural_feature"],
-                "rating": 4.5,
-                "user_ratings_total": 12000,
-                "category": "nature",
-                "why": "Beautiful sandy beach."
-            },
-            {
-                "name": f"{city} Shopping Mall",
-                "lat": 49.3 + cities.index(city) * 0.1,
-                "lng": -123.1,
-                "types": ["shopping_mall"],
-                "rating": 4.2,
-                "user_ratings_total": 3000,
-                "category": "shopping",
-                "why": "Premium shopping experience."
-            },
-            {
-                "name": f"{city} Historic Temple",
-                "lat": 49.32 + cities.index(city) * 0.1,
-                "lng": -123.13,
-                "types": ["place_of_worship", "tourist_attraction"],
-                "rating": 4.6,
-                "user_ratings_total": 20000,
-                "category": "cultural",
-                "why": "Ancient cultural landmark."
-            },
+            {"name": f"{city} {suffix}", "lat": base_lat + lat_offset, "lng": lng, **fields}
+            for suffix, base_lat, lng, fields in TEST_PLACE_TEMPLATES
         ]
         
         # Rank places
         ranked = rank_places(test_places, weather=weather)
         
-        print(f"\n{'Place':<30} {'Type':<15} {'Rating':<8} {'Reviews':<10} {'Score':<8} {'Notes'}")
-        print("-" * 100)
+        print(f"\n{'Place':<30} {'Type':<15} {'Rating':<8} {'Reviews':<10} {'Score':<8} {'Notes'}", file=out)
+        print("-" * 100, file=out)
         
         for place in ranked:
             place_type = place['category']
@@ -136,27 +127,29 @@ def test_scoring():
             
             notes_str = ", ".join(notes) if notes else "-"
             
-            print(f"{place['name']:<30} {place_type:<15} {rating:<8} {reviews:<10} {score:<8} {notes_str}")
+            print(f"{place['name']:<30} {place_type:<15} {rating:<8} {reviews:<10} {score:<8} {notes_str}", file=out)
         
         # Show filtered out places
-        original_names = {p['name'] for p in test_places}
         ranked_names = {p['name'] for p in ranked}
-        filtered_out = original_names - ranked_names
+        filtered_out = [p['name'] for p in test_places if p['name'] not in ranked_names]
         
         if filtered_out:
-            print(f"\n⚠️  Filtered out (score < 40): {', '.join(filtered_out)}")
+            print(f"\n⚠️  Filtered out (score < 40): {', '.join(filtered_out)}", file=out)
+        
+        sys.stdout.write(out.getvalue())
 
 
 def test_rain_scenario():
     """Test with forced rain to see outdoor penalties"""
-    print("\n" + "="*60)
-    print("SPECIAL TEST: Simulated RAIN scenario")
-    print("="*60)
+    out = io.StringIO()
+    print("\n" + "="*60, file=out)
+    print("SPECIAL TEST: Simulated RAIN scenario", file=out)
+    print("="*60, file=out)
     
     # Simulate rainy weather
     rain_weather = {"main": "Rain", "temp": 8.0, "description": "light rain"}
-    print(f"Weather: {rain_weather['main']} ({rain_weather['description']})")
-    print(f"Temperature: {rain_weather['temp']}°C")
+    print(f"Weather: {rain_weather['main']} ({rain_weather['description']})", file=out)
+    print(f"Temperature: {rain_weather['temp']}°C", file=out)
     
     test_places = [
         {
@@ -191,24 +184,27 @@ def test_rain_scenario():
     
     ranked = rank_places(test_places, weather=rain_weather)
     
-    print(f"\n{'Place':<35} {'Type':<12} {'Rating':<8} {'Score':<8} {'Rain Effect'}")
-    print("-" * 90)
+    print(f"\n{'Place':<35} {'Type':<12} {'Rating':<8} {'Score':<8} {'Rain Effect'}", file=out)
+    print("-" * 90, file=out)
     
     for place in ranked:
         is_outdoor = place['category'] in ['nature', 'park']
         rain_effect = "70% PENALTY ☔" if is_outdoor else "No penalty ✓"
-        print(f"{place['name']:<35} {place['category']:<12} {place['rating']:<8} {place['score']:<8} {rain_effect}")
+        print(f"{place['name']:<35} {place['category']:<12} {place['rating']:<8} {place['score']:<8} {rain_effect}", file=out)
+    
+    sys.stdout.write(out.getvalue())
 
 
 def test_cold_scenario():
     """Test with cold weather"""
-    print("\n" + "="*60)
-    print("SPECIAL TEST: Simulated COLD scenario (2°C)")
-    print("="*60)
+    out = io.StringIO()
+    print("\n" + "="*60, file=out)
+    print("SPECIAL TEST: Simulated COLD scenario (2°C)", file=out)
+    print("="*60, file=out)
     
     cold_weather = {"main": "Clear", "temp": 2.0, "description": "clear sky"}
-    print(f"Weather: {cold_weather['main']} ({cold_weather['description']})")
-    print(f"Temperature: {cold_weather['temp']}°C")
+    print(f"Weather: {cold_weather['main']} ({cold_weather['description']})", file=out)
+    print(f"Temperature: {cold_weather['temp']}°C", file=out)
     
     test_places = [
         {
@@ -229,13 +225,15 @@ def test_cold_scenario():
     
     ranked = rank_places(test_places, weather=cold_weather)
     
-    print(f"\n{'Place':<35} {'Type':<12} {'Rating':<8} {'Score':<8} {'Cold Effect'}")
-    print("-" * 90)
+    print(f"\n{'Place':<35} {'Type':<12} {'Rating':<8} {'Score':<8} {'Cold Effect'}", file=out)
+    print("-" * 90, file=out)
     
     for place in ranked:
         is_outdoor = place['category'] in ['nature', 'park']
         cold_effect = "50% PENALTY 🥶" if is_outdoor else "No penalty ✓"
-        print(f"{place['name']:<35} {place['category']:<12} {place['rating']:<8} {place['score']:<8} {cold_effect}")
+        print(f"{place['name']:<35} {place['category']:<12} {place['rating']:<8} {place['score']:<8} {cold_effect}", file=out)
+    
+    sys.stdout.write(out.getvalue())
 
 
 if __name__ == "__main__":
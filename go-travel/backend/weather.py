@@ -6,15 +6,61 @@ Fetches current weather data for scoring outdoor activities.
 
 import aiohttp
 import asyncio
+import atexit
+import orjson
 import os
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 
+from cache import cache_get_many, cache_set
+from http_session import LoopSessions
+
 load_dotenv()
 
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 WEATHER_API_URL = "https://api.openweathermap.org/data/2.5/weather"
 
+# Current conditions change slowly; cache per city for 10 minutes
+WEATHER_CACHE_TTL_SECONDS = 600
+
+
+def _make_weather_session() -> aiohttp.ClientSession:
+    """Build a weather session; called once per event loop by _sessions."""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300),
+        timeout=aiohttp.ClientTimeout(total=5),
+    )
+
+
+# Shared HTTP session so TLS/DNS setup to OpenWeatherMap is paid once, not on
+# every lookup. One per event loop (e.g. scripts that call asyncio.run more
+# than once), each closed when its loop shuts down.
+_sessions = LoopSessions(_make_weather_session)
+
+# The sync wrappers run on one long-lived background loop, so repeated calls
+# skip event loop setup/teardown. That loop has its own session (see
+# _sessions), created and closed on the loop's thread, so it never swaps
+# sessions with async callers on other loops.
+WEATHER_SYNC_TIMEOUT_SECONDS = 10
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def weather_cache_key(city: str) -> str:
+    """Build the Redis key for a city's weather (lowercased, whitespace-collapsed)."""
+    return "weather:v1:" + " ".join(city.lower().split())
+
+
+async def get_weather_session() -> aiohttp.ClientSession:
+    """Return the running loop's weather session, creating it on first use."""
+    return await _sessions.get()
+
+
+async def close_weather_session() -> None:
+    """Close the running loop's weather session (call on app shutdown)."""
+    await _sessions.close()
+
 
 async def fetch_weather(city: str) -> Optional[Dict[str, Any]]:
     """
@@ -31,6 +77,44 @@ async def fetch_weather(city: str) -> Optional[Dict[str, Any]]:
         print("WARNING: OPENWEATHER_API_KEY not set")
         return None
     
+    cached = (await cache_get_many([weather_cache_key(city)]))[0]
+    if cached:
+        return cached
+    
+    return await _fetch_one(await get_weather_session(), city)
+
+
+async def fetch_weather_many(cities: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Fetch current weather for several cities concurrently.
+    
+    Cached cities are read in one cache round-trip; the rest are fetched in
+    parallel over the shared HTTP session.
+    
+    Args:
+        cities: City names
+    
+    Returns:
+        Dict mapping each city to its weather dict (as fetch_weather), or None
+    """
+    if not OPENWEATHER_API_KEY:
+        print("WARNING: OPENWEATHER_API_KEY not set")
+        return {city: None for city in cities}
+    
+    cached = await cache_get_many([weather_cache_key(city) for city in cities])
+    results = {city: weather or None for city, weather in zip(cities, cached)}
+    missing = [city for city, weather in results.items() if weather is None]
+    
+    if missing:
+        session = await get_weather_session()
+        fetched = await asyncio.gather(*(_fetch_one(session, city) for city in missing))
+        results.update(zip(missing, fetched))
+    
+    return results
+
+
+async def _fetch_one(session: aiohttp.ClientSession, city: str) -> Optional[Dict[str, Any]]:
+    """Fetch one city's weather from OpenWeatherMap and cache it. Errors return None."""
     params = {
         "q": city,
         "appid": OPENWEATHER_API_KEY,
@@ -38,35 +122,67 @@ async def fetch_weather(city: str) -> Optional[Dict[str, Any]]:
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(WEATHER_API_URL, params=params) as response:
-                if response.status != 200:
-                    print(f"Weather API error: {response.status}")
-                    return None
-                
-                data = await response.json()
-                
-                # Extract relevant weather info
-                weather = {
-                    "main": data.get("weather", [{}])[0].get("main", "Unknown"),
-                    "description": data.get("weather", [{}])[0].get("description", ""),
-                    "temp": data.get("main", {}).get("temp", 20.0),
-                    "feels_like": data.get("main", {}).get("feels_like", 20.0),
-                    "humidity": data.get("main", {}).get("humidity", 50),
-                    "city": data.get("name", city),
-                    "country": data.get("sys", {}).get("country", "")
-                }
-                
-                return weather
-                
+        async with session.get(WEATHER_API_URL, params=params) as response:
+            if response.status != 200:
+                print(f"Weather API error: {response.status}")
+                return None
+            
+            data = orjson.loads(await response.read())
+            
+            # Extract only the fields scoring and the response use
+            condition = (data.get("weather") or [{}])[0]
+            readings = data.get("main", {})
+            weather = {
+                "main": condition.get("main", "Unknown"),
+                "description": condition.get("description", ""),
+                "temp": readings.get("temp", 20.0),
+                "feels_like": readings.get("feels_like", 20.0),
+                "humidity": readings.get("humidity", 50),
+            }
+        
+        await cache_set(weather_cache_key(city), weather, WEATHER_CACHE_TTL_SECONDS)
+        return weather
+    
     except Exception as e:
         print(f"Weather fetch error: {e}")
         return None
 
 
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop for the sync wrappers, starting it on first use."""
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_sync_loop.run_forever, name="weather-sync-loop", daemon=True
+            ).start()
+            atexit.register(_close_sync_loop)
+        return _sync_loop
+
+
+def _close_sync_loop() -> None:
+    """Close the background loop's session at interpreter exit."""
+    try:
+        asyncio.run_coroutine_threadsafe(close_weather_session(), _sync_loop).result(
+            timeout=WEATHER_SYNC_TIMEOUT_SECONDS
+        )
+    except Exception as e:
+        print(f"WARNING: Closing weather session failed: {type(e).__name__}: {e}")
+
+
 def fetch_weather_sync(city: str) -> Optional[Dict[str, Any]]:
     """Synchronous wrapper for fetch_weather."""
-    return asyncio.run(fetch_weather(city))
+    return asyncio.run_coroutine_threadsafe(fetch_weather(city), _get_sync_loop()).result(
+        timeout=WEATHER_SYNC_TIMEOUT_SECONDS
+    )
+
+
+def fetch_weather_many_sync(cities: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Synchronous wrapper for fetch_weather_many."""
+    return asyncio.run_coroutine_threadsafe(fetch_weather_many(cities), _get_sync_loop()).result(
+        timeout=WEATHER_SYNC_TIMEOUT_SECONDS
+    )
 
 
 # For testing